@@ -6,13 +6,95 @@
 # LICENSE file in the root directory of this source tree.
 
 import argparse
+import concurrent.futures
 import datetime
-import distutils.version
 import json
 import requests
 import subprocess
+import sys
 
-METADATA_URL = "http://169.254.169.254/latest/meta-data/"
+import awm_tokens
+import awm_transport
+
+METADATA_URL       = "http://169.254.169.254/latest/meta-data/"
+METADATA_TOKEN_URL = "http://169.254.169.254/latest/api/token"
+
+# Seconds the IMDSv2 session token is valid for, enough for all the lookups
+METADATA_TOKEN_TTL = 60
+
+# Timeouts in seconds for connecting to and reading from the metadata server
+METADATA_TIMEOUT = (2, 5)
+
+# Instance data used in the connector name mapped to their metadata paths. The
+# Name tag is only in the metadata when the instance allows tags in metadata.
+METADATA_PATHS = {
+    'zone':        "placement/availability-zone",
+    'instance_id': "instance-id",
+    'name':        "tags/instance/Name",
+}
+
+# Default maximum age in seconds of a cached connector token to reuse
+DEFAULT_MAX_AGE = 3600
+
+# File descriptor of stdout, which stays the same when sys.stdout is replaced
+STDOUT_FD = 1
+
+
+def metadata_session_create():
+    """A function to create a session to the EC2 instance metadata server
+
+    Gets an IMDSv2 session token once, which is sent with every request of
+    the session.
+
+    Returns:
+        requests.Session: the session
+    """
+
+    session = requests.Session()
+    resp = session.put(
+        METADATA_TOKEN_URL,
+        headers={'X-aws-ec2-metadata-token-ttl-seconds': str(METADATA_TOKEN_TTL)},
+        timeout=METADATA_TIMEOUT,
+    )
+    resp.raise_for_status()
+    session.headers.update({'X-aws-ec2-metadata-token': resp.text})
+
+    return session
+
+
+def metadata_get(session, path):
+    """A function to get an instance metadata value
+
+    Args:
+        session (requests.Session): session created by metadata_session_create()
+        path (str): path of the value under METADATA_URL
+    Returns:
+        string: the value, or None if the instance has no value at that path
+    """
+
+    resp = session.get(METADATA_URL + path, timeout=METADATA_TIMEOUT)
+    if resp.status_code == 404:
+        return None
+    resp.raise_for_status()
+
+    return resp.text
+
+
+def instance_metadata_get():
+    """A function to get the instance data used in the connector name
+
+    The values of METADATA_PATHS are fetched concurrently.
+
+    Returns:
+        dict: the keys of METADATA_PATHS mapped to their values
+    """
+
+    session = metadata_session_create()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(METADATA_PATHS)) as executor:
+        futures = { key: executor.submit(metadata_get, session, path) for key, path in METADATA_PATHS.items() }
+
+    return { key: future.result() for key, future in futures.items() }
 
 
 def create_connector_name():
@@ -24,8 +106,9 @@ def create_connector_name():
         string: a string for the connector name
     """
 
-    zone = requests.get(METADATA_URL + "placement/availability-zone").text
-    name = get_instance_name(zone[:-1])
+    metadata = instance_metadata_get()
+    zone = metadata['zone']
+    name = metadata['name'] or get_instance_name(zone[:-1], metadata['instance_id'])
     iso_time = datetime.datetime.utcnow().isoformat(
         timespec='seconds').replace(':', '').replace('-', '') + 'Z'
 
@@ -34,25 +117,42 @@ def create_connector_name():
     return connector_name
 
 
-def get_instance_name(region):
+def get_instance_name(region, instance_id):
     """A function to get the current EC2 instance name
 
-    Uses AWS CLI 'describe-tags' to retrieve the current EC2 instance name.
+    Used when tags are not in the instance metadata. Uses 'describe-tags' of
+    boto3 to retrieve the current EC2 instance name, or of the AWS CLI if
+    boto3 is not installed.
 
     Args:
-        region (str): the AWS region to perform 'describe-tags' using AWS CLI
+        region (str): the AWS region to perform 'describe-tags' in
+        instance_id (str): the ID of the current EC2 instance
     Returns:
         string: a string for the EC2 instance name
     """
 
-    instance_id = requests.get(METADATA_URL + "instance-id").text
-    filter_string = f"Name=resource-id,Values={instance_id}"
+    try:
+        # Only imported when needed, since boto3 is optional
+        import boto3
+    except ImportError:
+        boto3 = None
+
+    if boto3:
+        ec2 = boto3.client('ec2', region_name=region)
+        instance_tags = ec2.describe_tags(
+            Filters=[
+                {'Name': 'resource-id', 'Values': [instance_id]},
+                {'Name': 'key', 'Values': ['Name']},
+            ],
+        )
+    else:
+        filter_string = f"Name=resource-id,Values={instance_id} Name=key,Values=Name"
 
-    cmd = f'aws ec2 describe-tags --region {region} --filters {filter_string}'
+        cmd = f'aws ec2 describe-tags --region {region} --filters {filter_string}'
 
-    instance_tags = subprocess.run(
-        cmd.split(' '),  stdout=subprocess.PIPE).stdout.decode('utf-8')
-    instance_tags = json.loads(instance_tags)
+        instance_tags = subprocess.run(
+            cmd.split(' '),  stdout=subprocess.PIPE).stdout.decode('utf-8')
+        instance_tags = json.loads(instance_tags)
 
     instance_name = instance_tags.get('Tags')[0].get('Value')
 
@@ -76,7 +176,8 @@ def awm_login(key):
         'username': key['username'],
         'password': key['apiKey'],
     }
-    resp = session.post(
+    resp = awm_transport.idempotent_post(
+        session,
         f"{awm_api_url}/auth/signin",
         json=payload,
     )
@@ -85,6 +186,8 @@ def awm_login(key):
     token = resp.json()['data']['token']
     session.headers.update({"Authorization": token})
 
+    return token
+
 
 def get_connector_token(key, connector_name):
     print(f"Creating a connector token in deployment {key['deploymentId']}...")
@@ -93,7 +196,10 @@ def get_connector_token(key, connector_name):
         'deploymentId': key['deploymentId'],
         'connectorName': connector_name,
     }
-    resp = session.post(
+    # A token created by a request that is sent again is never used, so
+    # retrying only leaves an unused token for the same connector
+    resp = awm_transport.idempotent_post(
+        session,
         f"{awm_api_url}/auth/tokens/connector",
         json=payload,
     )
@@ -102,10 +208,23 @@ def get_connector_token(key, connector_name):
     return resp.json()['data']['token']
 
 
-def token_write(token, path):
-    print(f"Writing connector token to {path}...")
-    with open(path, 'w') as f:
-        f.write(token)
+def token_write(token, args):
+    """A function to write the connector token to the output chosen in the arguments
+
+    Args:
+        token (str): the connector token
+        args (argparse.Namespace): the arguments of the script
+    """
+
+    if args.out_fd is not None:
+        print(f"Writing connector token to file descriptor {args.out_fd}...")
+        awm_tokens.token_fd_write(token, args.out_fd)
+    elif args.out == '-':
+        print("Writing connector token to stdout...")
+        awm_tokens.token_fd_write(token, STDOUT_FD)
+    else:
+        print(f"Writing connector token to {args.out}...")
+        awm_tokens.token_write(token, args.out)
 
 
 if __name__ == '__main__':
@@ -114,46 +233,42 @@ if __name__ == '__main__':
 
     parser.add_argument(
         "awm", help="specify the path to Anyware Manager Deployment Service Account JSON file")
-    parser.add_argument("--out", required=True,
-                        help="File to write the connector token")
+    out_group = parser.add_mutually_exclusive_group(required=True)
+    out_group.add_argument("--out",
+                           help="File to write the connector token, or - to write it to stdout")
+    out_group.add_argument("--out-fd", type=int,
+                           help="Inherited file descriptor to write the connector token to")
     parser.add_argument(
         "--url", default="https://cas.teradici.com", help="specify the api url")
     parser.add_argument("--insecure", action="store_true",
                         help="Allow unverified HTTPS connection to Anyware Manager")
+    parser.add_argument("--cache",
+                        help="File to cache the Anyware Manager session and the connector token in, to reuse them while they are valid")
+    parser.add_argument("--max-age", type=int, default=DEFAULT_MAX_AGE,
+                        help=f"Maximum age in seconds of a cached connector token to reuse (Default: {DEFAULT_MAX_AGE})")
 
     args = parser.parse_args()
 
+    # When the token is written to stdout, the messages are written to stderr
+    # so that stdout only has the token
+    if args.out == '-':
+        sys.stdout = sys.stderr
+
     awm_api_url = f"{args.url}/api/v1"
 
     # Set up session to be used for all subsequent calls to Anyware Manager
-    session = requests.Session()
-    if args.insecure:
-        session.verify = False
-
-    try:
-        retry_strategy = requests.adapters.Retry(
-            total=10,
-            backoff_factor=1,
-            status_forcelist=[500,502,503,504],
-            allowed_methods=["POST", "GET"]
-        )
-    except TypeError as e:
-        # Older versions of urllib3 use method_whitelist instead of allowed_methods
-        installed_version = distutils.version.StrictVersion(requests.urllib3.__version__)
-        changed_version = distutils.version.StrictVersion("1.26.0")
-        if installed_version < changed_version:
-            retry_strategy = requests.adapters.Retry(
-                total=10,
-                backoff_factor=1,
-                status_forcelist=[500,502,503,504],
-                method_whitelist=["POST", "GET"]
-            )
-        else:
-            raise e
-    session.mount("https://", requests.adapters.HTTPAdapter(max_retries=retry_strategy))
+    session = awm_transport.session_create(verify=not args.insecure)
 
     dsa_key = load_service_account_key(args.awm)
-    awm_login(dsa_key)
-    connector_name = create_connector_name()
-    connector_token = get_connector_token(dsa_key, connector_name)
-    token_write(connector_token, args.out)
+
+    connector_token = awm_tokens.connector_token_get(
+        session,
+        dsa_key['deploymentId'],
+        signin=lambda: awm_login(dsa_key),
+        token_create=lambda connector_name: get_connector_token(dsa_key, connector_name),
+        connector_name_create=create_connector_name,
+        cache_path=args.cache,
+        max_age=args.max_age,
+    )
+
+    token_write(connector_token, args)
@@ -11,6 +11,11 @@ locals {
   provisioning_script = "awc-provisioning.sh"
   awm_script          = "get-connector-token.py"
 
+  # Stored under the awc/ prefix so it doesn't collide with the copy uploaded
+  # by the awm module to the same bucket
+  awm_transport_module = "awc/awm_transport.py"
+  awm_tokens_module    = "awc/awm_tokens.py"
+
   instance_info_list = flatten(
     [for i in range(length(var.zone_list)) :
       [for j in range(var.instance_count_list[i]) :
@@ -54,6 +59,22 @@ resource "aws_s3_object" "get-connector-token-script" {
   source = "${path.module}/${local.awm_script}"
 }
 
+resource "aws_s3_object" "awm-transport-module" {
+  count = length(local.instance_info_list) == 0 ? 0 : 1
+
+  bucket = var.bucket_name
+  key    = local.awm_transport_module
+  source = "${path.module}/../../../shared/python/awm_transport.py"
+}
+
+resource "aws_s3_object" "awm-tokens-module" {
+  count = length(local.instance_info_list) == 0 ? 0 : 1
+
+  bucket = var.bucket_name
+  key    = local.awm_tokens_module
+  source = "${path.module}/../../../shared/python/awm_tokens.py"
+}
+
 resource "aws_s3_object" "tls-key" {
   count = length(local.instance_info_list) == 0 ? 0 : var.tls_key == "" ? 0 : 1
 
@@ -87,6 +108,8 @@ resource "aws_s3_object" "awc-provisioning-script" {
       awm_deployment_sa_file_id   = var.awm_deployment_sa_file_id,
       awc_flag_manager_insecure   = var.awc_flag_manager_insecure ? "true" : "",
       awm_script                  = local.awm_script,
+      awm_transport_module        = local.awm_transport_module,
+      awm_tokens_module           = local.awm_tokens_module,
       manager_url                 = var.manager_url,
       cloudwatch_enable           = var.cloudwatch_enable,
       cloudwatch_setup_script     = var.cloudwatch_setup_script,
@@ -162,6 +185,8 @@ data "aws_iam_policy_document" "awc-policy-doc" {
     resources = [
       "arn:aws:s3:::${var.bucket_name}/${local.provisioning_script}",
       "arn:aws:s3:::${var.bucket_name}/${local.awm_script}",
+      "arn:aws:s3:::${var.bucket_name}/${local.awm_transport_module}",
+      "arn:aws:s3:::${var.bucket_name}/${local.awm_tokens_module}",
       "arn:aws:s3:::${var.bucket_name}/${var.cloudwatch_setup_script}",
       "arn:aws:s3:::${var.bucket_name}/${var.ldaps_cert_filename}",
     ]
@@ -259,6 +284,8 @@ resource "aws_instance" "awc" {
     aws_s3_object.tls-key,
     aws_s3_object.tls-cert,
     aws_s3_object.get-connector-token-script,
+    aws_s3_object.awm-transport-module,
+    aws_s3_object.awm-tokens-module,
     aws_s3_object.awc-provisioning-script,
     # wait 5 seconds before deleting the log group to account for delays in
     # Cloudwatch receiving the last messages before an EC2 instance is shut down
@@ -286,6 +313,13 @@ resource "aws_instance" "awc" {
 
   user_data = data.template_file.user-data.rendered
 
+  # Tags in the instance metadata let get-connector-token.py read the Name tag
+  # without calling the EC2 API
+  metadata_options {
+    http_endpoint          = "enabled"
+    instance_metadata_tags = "enabled"
+  }
+
   tags = {
     Name = "${local.prefix}${var.host_name}-${count.index}"
   }
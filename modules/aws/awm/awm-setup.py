@@ -6,21 +6,35 @@
 # LICENSE file in the root directory of this source tree.
 
 import argparse
+import concurrent.futures
 import json
 import requests
 import configparser
 import boto3
 from botocore.exceptions import ClientError
 
+import awm_transport
+import step_timing
+
 AWM_API_URL = "https://localhost/api/v1"
 ADMIN_USER = "adminUser"
 
+# Steps that don't depend on each other, such as looking up the AWS username
+# while the deployment is created, run at the same time in this many threads
+SETUP_WORKERS = 2
+
+# Records the timing of the setup steps, written to the provisioning log at
+# the end of the setup
+step_timer = step_timing.StepTimer()
+
+
 def awm_login(username, password):
     payload = {
         'username': username,
         'password': password,
     }
-    resp = session.post(
+    resp = awm_transport.idempotent_post(
+        session,
         f"{AWM_API_URL}/auth/ad/login",
         json=payload,
     )
@@ -93,7 +107,8 @@ def validate_aws_sa(username, key):
             'secretAccessKey': key['aws_secret_access_key'],
         },
     }
-    resp = session.post(
+    resp = awm_transport.idempotent_post(
+        session,
         f"{AWM_API_URL}/auth/users/cloudServiceAccount/validate",
         json = payload,
     )
@@ -136,6 +151,26 @@ def deployment_add_aws_account(username, key, deployment):
         print(e)
 
 
+def aws_sa_key_and_username_get(path):
+    key = step_timer.timed('aws_key_read', get_aws_sa_key, path)
+    username = step_timer.timed('aws_username_get', get_username, key)
+
+    return key, username
+
+
+def aws_sa_check(key_future):
+    """A function to validate the AWS credentials once they are read
+
+    Returns:
+        tuple: the AWS key, the AWS username, and whether they are valid
+    """
+
+    key, username = key_future.result()
+    valid = bool(username) and step_timer.timed('aws_sa_validate', validate_aws_sa, username, key)
+
+    return key, username, valid
+
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="This script updates the password for the Anyware Manager Admin user.")
 
@@ -149,31 +184,33 @@ if __name__ == '__main__':
     args = parser.parse_args()
 
     # Set up session to be used for all subsequent calls to Anyware Manager
-    session = requests.Session()
-    session.verify = False
-    retry_strategy = requests.adapters.Retry(
-        total=10,
-        backoff_factor=1,
-        status_forcelist=[500,502,503,504],
-        allowed_methods=["POST"] # "method_whitelist" deprecated
-    )
-    session.mount(
-        "https://", requests.adapters.HTTPAdapter(max_retries=retry_strategy)
-    )
+    session = awm_transport.session_create(verify=False)
 
     # The credential for Anyware Manager login are stated in default configuration
     # https://www.teradici.com/web-help/anyware_manager/23.04/cam_standalone_installation/default_config/#5-access-the-admin-console
-    print("Creating Anyware Manager deployment...")
-    awm_login(ADMIN_USER, args.password)
-    deployment = deployment_create(args.deployment_name, args.reg_code)
-    awm_deployment_key = deployment_key_create(deployment, args.key_name)
-    deployment_key_write(awm_deployment_key, args.key_file)
-
-    if args.aws_key:
-        key = get_aws_sa_key(args.aws_key)
-        username = get_username(key)
-        if username and validate_aws_sa(username, key):
-            print("Adding AWS credentials to Anyware Manager deployment...")
-            deployment_add_aws_account(username, key, deployment)
-        else:
-            print("Skip adding AWS credentials to Anyware Manager deployment.")
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=SETUP_WORKERS) as executor:
+            # Reading the AWS key and looking up its username don't need Anyware Manager
+            if args.aws_key:
+                key_future = executor.submit(aws_sa_key_and_username_get, args.aws_key)
+
+            print("Creating Anyware Manager deployment...")
+            step_timer.timed('awm_login', awm_login, ADMIN_USER, args.password)
+
+            # The AWS credentials are validated while the deployment is created
+            if args.aws_key:
+                check_future = executor.submit(aws_sa_check, key_future)
+
+            deployment = step_timer.timed('deployment_create', deployment_create, args.deployment_name, args.reg_code)
+            awm_deployment_key = step_timer.timed('deployment_key_create', deployment_key_create, deployment, args.key_name)
+            step_timer.timed('deployment_key_write', deployment_key_write, awm_deployment_key, args.key_file)
+
+            if args.aws_key:
+                key, username, valid = check_future.result()
+                if valid:
+                    print("Adding AWS credentials to Anyware Manager deployment...")
+                    step_timer.timed('deployment_add_aws_account', deployment_add_aws_account, username, key, deployment)
+                else:
+                    print("Skip adding AWS credentials to Anyware Manager deployment.")
+    finally:
+        step_timer.report_print('Anyware Manager setup')
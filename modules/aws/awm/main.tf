@@ -11,6 +11,11 @@ locals {
   enable_public_ip    = var.enable_public_ip ? [true] : []
   awm_setup_script    = "awm-setup.py"
   provisioning_script = "awm-provisioning.sh"
+
+  # Stored under the awm/ prefix so it doesn't collide with the copy uploaded
+  # by the awc module to the same bucket
+  awm_transport_module = "awm/awm_transport.py"
+  step_timing_module   = "awm/step_timing.py"
 }
 
 resource "aws_s3_object" "awm-setup-script" {
@@ -19,6 +24,18 @@ resource "aws_s3_object" "awm-setup-script" {
   source = "${path.module}/${local.awm_setup_script}"
 }
 
+resource "aws_s3_object" "awm-transport-module" {
+  bucket = var.bucket_name
+  key    = local.awm_transport_module
+  source = "${path.module}/../../../shared/python/awm_transport.py"
+}
+
+resource "aws_s3_object" "awm-step-timing-module" {
+  bucket = var.bucket_name
+  key    = local.step_timing_module
+  source = "${path.module}/../../../shared/python/step_timing.py"
+}
+
 resource "aws_s3_object" "awm-provisioning-script" {
   bucket = var.bucket_name
   key    = local.provisioning_script
@@ -30,6 +47,8 @@ resource "aws_s3_object" "awm-provisioning-script" {
       awm_deployment_sa_file_id   = var.awm_deployment_sa_file_id,
       awm_repo_channel            = var.awm_repo_channel,
       awm_setup_script            = local.awm_setup_script,
+      awm_transport_module        = local.awm_transport_module,
+      step_timing_module          = local.step_timing_module,
       aws_region                  = var.aws_region,
       aws_ssm_enable              = var.aws_ssm_enable,
       bucket_name                 = var.bucket_name,
@@ -113,7 +132,11 @@ data "aws_iam_policy_document" "awm-policy-doc" {
 
   statement {
     actions   = ["s3:GetObject"]
-    resources = ["arn:aws:s3:::${var.bucket_name}/${local.awm_setup_script}"]
+    resources = [
+      "arn:aws:s3:::${var.bucket_name}/${local.awm_setup_script}",
+      "arn:aws:s3:::${var.bucket_name}/${local.awm_transport_module}",
+      "arn:aws:s3:::${var.bucket_name}/${local.step_timing_module}",
+    ]
     effect    = "Allow"
   }
 
@@ -173,6 +196,8 @@ resource "time_sleep" "delay_destroy_log_group" {
 resource "aws_instance" "awm" {
   depends_on = [
     aws_s3_object.awm-setup-script,
+    aws_s3_object.awm-transport-module,
+    aws_s3_object.awm-step-timing-module,
     aws_s3_object.awm-provisioning-script,
     # wait 5 seconds before deleting the log group to account for delays in
     # Cloudwatch receiving the last messages before an EC2 instance is shut down
@@ -6,10 +6,28 @@
 # LICENSE file in the root directory of this source tree.
 
 import argparse
+import concurrent.futures
 import datetime
-import distutils.version
 import json
+import os
 import requests
+import sys
+
+import awm_tokens
+import awm_transport
+
+# Default maximum age in seconds of a cached connector token to reuse
+DEFAULT_MAX_AGE = 3600
+
+# File descriptor of stdout, which stays the same when sys.stdout is replaced
+STDOUT_FD = 1
+
+# Default template of the connector names and token files in bulk mode
+DEFAULT_NAME_TEMPLATE = "awc-igm-{index}-{time}"
+
+# Maximum number of connector tokens created at the same time in bulk mode,
+# which matches the number of connections kept alive by the session
+MAX_CONCURRENT_REQUESTS = awm_transport.DEFAULT_POOL_SIZE
 
 
 def create_connector_name():
@@ -52,7 +70,8 @@ def awm_login(key):
         'username': key['username'], 
         'password': key['apiKey'],
     }
-    resp = session.post(
+    resp = awm_transport.idempotent_post(
+        session,
         f"{awm_api_url}/auth/signin",
         json=payload, 
     )
@@ -61,6 +80,8 @@ def awm_login(key):
     token = resp.json()['data']['token']
     session.headers.update({"Authorization": token})
 
+    return token
+
 
 def get_awc_token(key, connector_name):
     print(f"Creating a connector token in deployment {key['deploymentId']}...")
@@ -69,7 +90,10 @@ def get_awc_token(key, connector_name):
         'deploymentId': key['deploymentId'], 
         'connectorName': connector_name,
     }
-    resp = session.post(
+    # A token created by a request that is sent again is never used, so
+    # retrying only leaves an unused token for the same connector
+    resp = awm_transport.idempotent_post(
+        session,
         f"{awm_api_url}/auth/tokens/connector",
         json=payload, 
     )
@@ -78,53 +102,112 @@ def get_awc_token(key, connector_name):
     return resp.json()['data']['token']
 
 
-def token_write(token, path):
-    print(f"Writing connector token to {path}...")
-    with open(path, 'w') as f:
-        f.write(token)
+def awc_tokens_create(key, connector_names, out_dir):
+    """A function to create connector tokens concurrently in bulk mode
+
+    Each token is written to a file in out_dir named after its connector.
+
+    Args:
+        key (dict): the Anyware Manager deployment service account key
+        connector_names (list): the names of the connectors
+        out_dir (str): directory to write the connector tokens in
+    Returns:
+        dict: the connector names mapped to the errors raised
+    """
+
+    os.makedirs(out_dir, mode=0o700, exist_ok=True)
+
+    def awc_token_create(connector_name):
+        awc_token = get_awc_token(key, connector_name)
+        print(f"Writing connector token to {os.path.join(out_dir, connector_name)}...")
+        awm_tokens.token_write(awc_token, os.path.join(out_dir, connector_name))
+
+    errors = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
+        futures = { executor.submit(awc_token_create, n): n for n in connector_names }
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                future.result()
+            # Carry on so that one failed token doesn't stop the others
+            except Exception as e:
+                errors[futures[future]] = e
+
+    return errors
+
+
+def token_write(token, args):
+    """A function to write the connector token to the output chosen in the arguments
+
+    Args:
+        token (str): the connector token
+        args (argparse.Namespace): the arguments of the script
+    """
+
+    if args.out_fd is not None:
+        print(f"Writing connector token to file descriptor {args.out_fd}...")
+        awm_tokens.token_fd_write(token, args.out_fd)
+    elif args.out == '-':
+        print("Writing connector token to stdout...")
+        awm_tokens.token_fd_write(token, STDOUT_FD)
+    else:
+        print(f"Writing connector token to {args.out}...")
+        awm_tokens.token_write(token, args.out)
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="This script uses Anyware Manager Deployment Service Account JSON file to create a new connector token.")
 
     parser.add_argument("awm", help="specify the path to Anyware Manager Deployment Service Account JSON file")
-    parser.add_argument("--out", required=True, help="File to write the connector token")
+    out_group = parser.add_mutually_exclusive_group(required=True)
+    out_group.add_argument("--out", help="File to write the connector token, or - to write it to stdout")
+    out_group.add_argument("--out-fd", type=int, help="Inherited file descriptor to write the connector token to")
+    out_group.add_argument("--out-dir", help="Directory to write the connector tokens in bulk mode, one file per connector")
+    parser.add_argument("--count", type=int, default=1, help="Number of connector tokens to create in bulk mode (Default: 1)")
+    parser.add_argument("--name-template", default=DEFAULT_NAME_TEMPLATE, help=f"Template of the connector names and token files in bulk mode, with the fields {{index}} and {{time}} (Default: {DEFAULT_NAME_TEMPLATE})")
     parser.add_argument("--url", default="https://cas.teradici.com", help="specify the api url")
     parser.add_argument("--insecure", action="store_true", help="Allow unverified HTTPS connection to Anyware Manager")
+    parser.add_argument("--cache", help="File to cache the Anyware Manager session and the connector token in, to reuse them while they are valid")
+    parser.add_argument("--max-age", type=int, default=DEFAULT_MAX_AGE, help=f"Maximum age in seconds of a cached connector token to reuse (Default: {DEFAULT_MAX_AGE})")
 
     args = parser.parse_args()
 
+    # When the token is written to stdout, the messages are written to stderr
+    # so that stdout only has the token
+    if args.out == '-':
+        sys.stdout = sys.stderr
+
     awm_api_url = f"{args.url}/api/v1"
 
     # Set up session to be used for all subsequent calls to Anyware Manager
-    session = requests.Session()
-    if args.insecure:
-        session.verify = False
-
-    try:
-        retry_strategy = requests.adapters.Retry(
-            total=10,
-            backoff_factor=1,
-            status_forcelist=[500,502,503,504],
-            allowed_methods=["POST", "GET"]
-        )
-    except TypeError as e:
-        # Older versions of urllib3 use method_whitelist instead of allowed_methods
-        installed_version = distutils.version.StrictVersion(requests.urllib3.__version__)
-        changed_version = distutils.version.StrictVersion("1.26.0")
-        if installed_version < changed_version:
-            retry_strategy = requests.adapters.Retry(
-                total=10,
-                backoff_factor=1,
-                status_forcelist=[500,502,503,504],
-                method_whitelist=["POST", "GET"]
-            )
-        else:
-            raise e
-    session.mount("https://", requests.adapters.HTTPAdapter(max_retries=retry_strategy))
+    session = awm_transport.session_create(verify=not args.insecure)
 
     dsa_key = load_service_account_key(args.awm)
-    awm_login(dsa_key)
-    connector_name = create_connector_name()
-    awc_token = get_awc_token(dsa_key, connector_name)
-    token_write(awc_token, args.out)
+
+    if args.out_dir:
+        # Bulk mode signs in once for all the tokens, without the cache
+        iso_time = datetime.datetime.utcnow().isoformat(timespec='seconds').replace(':','').replace('-','') + 'Z'
+        try:
+            connector_names = [args.name_template.format(index=i, time=iso_time) for i in range(args.count)]
+        except (KeyError, IndexError, ValueError) as e:
+            parser.error(f"--name-template is not valid: {e!r}")
+        if len(set(connector_names)) != args.count:
+            parser.error("--name-template must contain {index} to create several tokens")
+
+        awm_login(dsa_key)
+        errors = awc_tokens_create(dsa_key, connector_names, args.out_dir)
+        for connector_name, e in errors.items():
+            print(f"ERROR: Failed to create a connector token for {connector_name}: {e}")
+        print(f"Created {args.count - len(errors)} of {args.count} connector tokens in {args.out_dir}.")
+        sys.exit(1 if errors else 0)
+
+    awc_token = awm_tokens.connector_token_get(
+        session,
+        dsa_key['deploymentId'],
+        signin=lambda: awm_login(dsa_key),
+        token_create=lambda connector_name: get_awc_token(dsa_key, connector_name),
+        connector_name_create=create_connector_name,
+        cache_path=args.cache,
+        max_age=args.max_age,
+    )
+
+    token_write(awc_token, args)
@@ -11,6 +11,11 @@ locals {
   provisioning_script = "awc-provisioning.sh"
   awm_script          = "get-connector-token.py"
 
+  # Stored under the awc/ prefix so it doesn't collide with the copy uploaded
+  # by the awm module to the same bucket
+  awm_transport_module = "awc/awm_transport.py"
+  awm_tokens_module    = "awc/awm_tokens.py"
+
   num_instances = length(flatten([for i in var.instance_count_list : range(i)]))
   num_regions   = length(var.gcp_region_list)
 
@@ -40,6 +45,22 @@ resource "google_storage_bucket_object" "get-awc-token-script" {
   source = "${path.module}/${local.awm_script}"
 }
 
+resource "google_storage_bucket_object" "awm-transport-module" {
+  count = local.num_instances == 0 ? 0 : 1
+
+  bucket = var.bucket_name
+  name   = local.awm_transport_module
+  source = "${path.module}/../../../shared/python/awm_transport.py"
+}
+
+resource "google_storage_bucket_object" "awm-tokens-module" {
+  count = local.num_instances == 0 ? 0 : 1
+
+  bucket = var.bucket_name
+  name   = local.awm_tokens_module
+  source = "${path.module}/../../../shared/python/awm_tokens.py"
+}
+
 # This is needed so new VMs will be based on the same image in case the public
 # images gets updated
 data "google_compute_image" "awc-base-img" {
@@ -63,6 +84,8 @@ resource "google_storage_bucket_object" "awc-provisioning-script" {
       awm_deployment_sa_file         = var.awm_deployment_sa_file,
       awm_deployment_sa_file_id      = var.awm_deployment_sa_file_id,
       awm_script                     = local.awm_script,
+      awm_transport_module           = local.awm_transport_module,
+      awm_tokens_module              = local.awm_tokens_module,
       bucket_name                    = var.bucket_name,
       computers_dn                   = var.computers_dn,
       domain_controller_ip           = var.domain_controller_ip,
@@ -86,6 +109,8 @@ resource "google_compute_instance_template" "awc-template" {
 
   depends_on = [
     google_storage_bucket_object.get-awc-token-script,
+    google_storage_bucket_object.awm-transport-module,
+    google_storage_bucket_object.awm-tokens-module,
     # Provisioning script dependency should be inferred by Terraform
     # google_storage_bucket_object.awc-provisioning-script,
   ]
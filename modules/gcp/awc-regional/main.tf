@@ -28,6 +28,8 @@ resource "google_storage_bucket_object" "awc-provisioning-script" {
       awm_deployment_sa_file         = var.awm_deployment_sa_file,
       awm_deployment_sa_file_id      = var.awm_deployment_sa_file_id,
       awm_script                     = var.awm_script,
+      awm_transport_module           = var.awm_transport_module,
+      awm_tokens_module              = var.awm_tokens_module,
       bucket_name                    = var.bucket_name,
       domain_controller_ip           = var.domain_controller_ip,
       domain_name                    = var.domain_name,
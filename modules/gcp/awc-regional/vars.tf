@@ -171,6 +171,16 @@ variable "awm_script" {
   type        = string
 }
 
+variable "awm_transport_module" {
+  description = "Name of the HTTP transport module used by the script to interact with Anyware Manager"
+  type        = string
+}
+
+variable "awm_tokens_module" {
+  description = "Name of the token module used by the script to interact with Anyware Manager"
+  type        = string
+}
+
 variable "tls_key_filename" {
   description = "TLS private key for the Connector"
   type        = string
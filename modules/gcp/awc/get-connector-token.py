@@ -9,6 +9,16 @@ import argparse
 import datetime
 import json
 import requests
+import sys
+
+import awm_tokens
+import awm_transport
+
+# Default maximum age in seconds of a cached connector token to reuse
+DEFAULT_MAX_AGE = 3600
+
+# File descriptor of stdout, which stays the same when sys.stdout is replaced
+STDOUT_FD = 1
 
 
 def create_connector_name():
@@ -53,7 +63,8 @@ def awm_login(key):
         'username': key['username'],
         'password': key['apiKey'],
     }
-    resp = session.post(
+    resp = awm_transport.idempotent_post(
+        session,
         f"{awm_api_url}/auth/signin",
         json=payload,
     )
@@ -62,6 +73,8 @@ def awm_login(key):
     token = resp.json()['data']['token']
     session.headers.update({"Authorization": token})
 
+    return token
+
 
 def get_awc_token(key, connector_name):
     print(f"Creating a connector token in deployment {key['deploymentId']}...")
@@ -70,7 +83,10 @@ def get_awc_token(key, connector_name):
         'deploymentId': key['deploymentId'],
         'connectorName': connector_name,
     }
-    resp = session.post(
+    # A token created by a request that is sent again is never used, so
+    # retrying only leaves an unused token for the same connector
+    resp = awm_transport.idempotent_post(
+        session,
         f"{awm_api_url}/auth/tokens/connector",
         json=payload,
     )
@@ -79,10 +95,23 @@ def get_awc_token(key, connector_name):
     return resp.json()['data']['token']
 
 
-def token_write(token, path):
-    print(f"Writing connector token to {path}...")
-    with open(path, 'w') as f:
-        f.write(token)
+def token_write(token, args):
+    """A function to write the connector token to the output chosen in the arguments
+
+    Args:
+        token (str): the connector token
+        args (argparse.Namespace): the arguments of the script
+    """
+
+    if args.out_fd is not None:
+        print(f"Writing connector token to file descriptor {args.out_fd}...")
+        awm_tokens.token_fd_write(token, args.out_fd)
+    elif args.out == '-':
+        print("Writing connector token to stdout...")
+        awm_tokens.token_fd_write(token, STDOUT_FD)
+    else:
+        print(f"Writing connector token to {args.out}...")
+        awm_tokens.token_write(token, args.out)
 
 
 if __name__ == '__main__':
@@ -91,24 +120,42 @@ if __name__ == '__main__':
 
     parser.add_argument(
         "awm", help="specify the path to Anyware Manager Deployment Service Account JSON file")
-    parser.add_argument("--out", required=True,
-                        help="File to write the connector token")
+    out_group = parser.add_mutually_exclusive_group(required=True)
+    out_group.add_argument("--out",
+                           help="File to write the connector token, or - to write it to stdout")
+    out_group.add_argument("--out-fd", type=int,
+                           help="Inherited file descriptor to write the connector token to")
     parser.add_argument(
         "--url", default="https://cas.teradici.com", help="specify the api url")
     parser.add_argument("--insecure", action="store_true",
                         help="Allow unverified HTTPS connection to Anyware Manager")
+    parser.add_argument("--cache",
+                        help="File to cache the Anyware Manager session and the connector token in, to reuse them while they are valid")
+    parser.add_argument("--max-age", type=int, default=DEFAULT_MAX_AGE,
+                        help=f"Maximum age in seconds of a cached connector token to reuse (Default: {DEFAULT_MAX_AGE})")
 
     args = parser.parse_args()
 
+    # When the token is written to stdout, the messages are written to stderr
+    # so that stdout only has the token
+    if args.out == '-':
+        sys.stdout = sys.stderr
+
     awm_api_url = f"{args.url}/api/v1"
 
     # Set up session to be used for all subsequent calls to Anyware Manager
-    session = requests.Session()
-    if args.insecure:
-        session.verify = False
+    session = awm_transport.session_create(verify=not args.insecure)
 
     dsa_key = load_service_account_key(args.awm)
-    awm_login(dsa_key)
-    connector_name = create_connector_name()
-    awc_token = get_awc_token(dsa_key, connector_name)
-    token_write(awc_token, args.out)
+
+    awc_token = awm_tokens.connector_token_get(
+        session,
+        dsa_key['deploymentId'],
+        signin=lambda: awm_login(dsa_key),
+        token_create=lambda connector_name: get_awc_token(dsa_key, connector_name),
+        connector_name_create=create_connector_name,
+        cache_path=args.cache,
+        max_age=args.max_age,
+    )
+
+    token_write(awc_token, args)
@@ -10,6 +10,11 @@ locals {
 
   awm_script = "get-connector-token.py"
 
+  # Stored under the awc/ prefix so it doesn't collide with the copy uploaded
+  # by the awm module to the same bucket
+  awm_transport_module = "awc/awm_transport.py"
+  awm_tokens_module    = "awc/awm_tokens.py"
+
   num_regions = length(var.gcp_region_list)
   num_instances = length(flatten(
     [for i in range(local.num_regions) :
@@ -29,6 +34,22 @@ resource "google_storage_bucket_object" "get-connector-token-script" {
   source = "${path.module}/${local.awm_script}"
 }
 
+resource "google_storage_bucket_object" "awm-transport-module" {
+  count = local.num_instances == 0 ? 0 : 1
+
+  bucket = var.bucket_name
+  name   = local.awm_transport_module
+  source = "${path.module}/../../../shared/python/awm_transport.py"
+}
+
+resource "google_storage_bucket_object" "awm-tokens-module" {
+  count = local.num_instances == 0 ? 0 : 1
+
+  bucket = var.bucket_name
+  name   = local.awm_tokens_module
+  source = "${path.module}/../../../shared/python/awm_tokens.py"
+}
+
 resource "google_storage_bucket_object" "tls-key" {
   count = local.num_instances == 0 ? 0 : var.tls_key == "" ? 0 : 1
 
@@ -60,6 +81,8 @@ module "awc-regional" {
   awm_deployment_sa_file_id = var.awm_deployment_sa_file_id
 
   awm_script                = local.awm_script
+  awm_transport_module      = local.awm_transport_module
+  awm_tokens_module         = local.awm_tokens_module
   awc_flag_manager_insecure = var.awc_flag_manager_insecure
   manager_url               = var.manager_url
 
@@ -94,5 +117,7 @@ module "awc-regional" {
     google_storage_bucket_object.tls-key,
     google_storage_bucket_object.tls-cert,
     google_storage_bucket_object.get-connector-token-script,
+    google_storage_bucket_object.awm-transport-module,
+    google_storage_bucket_object.awm-tokens-module,
   ]
 }
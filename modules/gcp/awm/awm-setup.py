@@ -6,18 +6,32 @@
 # LICENSE file in the root directory of this source tree.
 
 import argparse
+import concurrent.futures
 import json
 import requests
 
+import awm_transport
+import step_timing
+
 AWM_API_URL = "https://localhost/api/v1"
 ADMIN_USER = "adminUser"
 
+# Steps that don't depend on each other, such as validating the GCP key
+# while the deployment is created, run at the same time in this many threads
+SETUP_WORKERS = 2
+
+# Records the timing of the setup steps, written to the provisioning log at
+# the end of the setup
+step_timer = step_timing.StepTimer()
+
+
 def awm_login(username, password):
     payload = {
         'username': username,
         'password': password,
     }
-    resp = session.post(
+    resp = awm_transport.idempotent_post(
+        session,
         f"{AWM_API_URL}/auth/ad/login",
         json=payload,
     )
@@ -76,7 +90,8 @@ def validate_gcp_sa(key):
             'projectId':   key['project_id'],
         },
     }
-    resp = session.post(
+    resp = awm_transport.idempotent_post(
+        session,
         f"{AWM_API_URL}/auth/users/cloudServiceAccount/validate",
         json = payload,
     )
@@ -122,6 +137,21 @@ def deployment_add_gcp_account(key, deployment):
         print(e)
 
 
+def gcp_sa_check(key_future):
+    """A function to validate the GCP credentials once they are read
+
+    Returns:
+        tuple: the GCP key, and whether it is valid
+    """
+
+    gcp_sa_key = key_future.result()
+
+    print("Validating GCP credentials with Anyware Manager...")
+    valid = step_timer.timed('gcp_sa_validate', validate_gcp_sa, gcp_sa_key)
+
+    return gcp_sa_key, valid
+
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="This script updates the password for the Anyware Manager Admin user.")
 
@@ -135,34 +165,33 @@ if __name__ == '__main__':
     args = parser.parse_args()
 
     # Set up session to be used for all subsequent calls to Anyware Manager
-    session = requests.Session()
-    session.verify = False
-    retry_strategy = requests.adapters.Retry(
-        total=10,
-        backoff_factor=1,
-        status_forcelist=[500,502,503,504],
-        allowed_methods=["POST"] # "method_whitelist" deprecated
-    )
-    session.mount(
-        "https://", requests.adapters.HTTPAdapter(max_retries=retry_strategy)
-    )
+    session = awm_transport.session_create(verify=False)
 
     # The credential for Anyware Manager login are stated in default configuration
     # https://www.teradici.com/web-help/anyware_manager/23.04/cam_standalone_installation/default_config/#5-access-the-admin-console
-    print("Creating Anyware Manager deployment...")
-    awm_login(ADMIN_USER, args.password)
-    deployment = deployment_create(args.deployment_name, args.reg_code)
-    awm_deployment_key = deployment_key_create(deployment, args.key_name)
-    deployment_key_write(awm_deployment_key, args.key_file)
-
-    if args.gcp_key:
-        gcp_sa_key = get_gcp_sa_key(args.gcp_key)
-
-        print("Validating GCP credentials with Anyware Manager...")
-        valid = validate_gcp_sa(gcp_sa_key)
-
-        if valid:
-            print("Adding GCP credentials to Anyware Manager deployment...")
-            deployment_add_gcp_account(gcp_sa_key, deployment)
-        else:
-            print("WARNING: GCP credentials validation failed. Skip adding GCP credentials to Anyware Manager deployment.")
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=SETUP_WORKERS) as executor:
+            # Reading the GCP key doesn't need Anyware Manager
+            if args.gcp_key:
+                key_future = executor.submit(step_timer.timed, 'gcp_key_read', get_gcp_sa_key, args.gcp_key)
+
+            print("Creating Anyware Manager deployment...")
+            step_timer.timed('awm_login', awm_login, ADMIN_USER, args.password)
+
+            # The GCP credentials are validated while the deployment is created
+            if args.gcp_key:
+                check_future = executor.submit(gcp_sa_check, key_future)
+
+            deployment = step_timer.timed('deployment_create', deployment_create, args.deployment_name, args.reg_code)
+            awm_deployment_key = step_timer.timed('deployment_key_create', deployment_key_create, deployment, args.key_name)
+            step_timer.timed('deployment_key_write', deployment_key_write, awm_deployment_key, args.key_file)
+
+            if args.gcp_key:
+                gcp_sa_key, valid = check_future.result()
+                if valid:
+                    print("Adding GCP credentials to Anyware Manager deployment...")
+                    step_timer.timed('deployment_add_gcp_account', deployment_add_gcp_account, gcp_sa_key, deployment)
+                else:
+                    print("WARNING: GCP credentials validation failed. Skip adding GCP credentials to Anyware Manager deployment.")
+    finally:
+        step_timer.report_print('Anyware Manager setup')
@@ -11,6 +11,11 @@ locals {
   enable_public_ip    = var.enable_public_ip ? [true] : []
   awm_setup_script    = "awm-setup.py"
   provisioning_script = "awm-provisioning.sh"
+
+  # Stored under the awm/ prefix so it doesn't collide with the copy uploaded
+  # by the awc module to the same bucket
+  awm_transport_module = "awm/awm_transport.py"
+  step_timing_module   = "awm/step_timing.py"
 }
 
 resource "google_storage_bucket_object" "awm-post-install-script" {
@@ -19,6 +24,18 @@ resource "google_storage_bucket_object" "awm-post-install-script" {
   source = "${path.module}/${local.awm_setup_script}"
 }
 
+resource "google_storage_bucket_object" "awm-transport-module" {
+  bucket = var.bucket_name
+  name   = local.awm_transport_module
+  source = "${path.module}/../../../shared/python/awm_transport.py"
+}
+
+resource "google_storage_bucket_object" "awm-step-timing-module" {
+  bucket = var.bucket_name
+  name   = local.step_timing_module
+  source = "${path.module}/../../../shared/python/step_timing.py"
+}
+
 resource "google_storage_bucket_object" "awm-provisioning-script" {
   bucket = var.bucket_name
   name   = local.provisioning_script
@@ -30,6 +47,8 @@ resource "google_storage_bucket_object" "awm-provisioning-script" {
       awm_admin_password_id      = var.awm_admin_password_id,
       awm_repo_channel           = var.awm_repo_channel,
       awm_setup_script           = local.awm_setup_script,
+      awm_transport_module       = local.awm_transport_module,
+      step_timing_module         = local.step_timing_module,
       bucket_name                = var.bucket_name,
       gcp_ops_agent_enable       = var.gcp_ops_agent_enable,
       gcp_sa_file                = var.gcp_sa_file,
@@ -5,6 +5,7 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
+import argparse
 import datetime
 import getpass
 import importlib
@@ -18,10 +19,15 @@ import sys
 import textwrap
 import time
 
+# The modules shared by the quickstarts live in shared/python
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'shared', 'python'))
+import quickstart_config
+
 REQUIRED_PACKAGES = {
     'boto3': None, 
     'retry': None, 
     'requests': None,
+    'aiohttp': None,
 }
 
 iso_time = datetime.datetime.utcnow().isoformat(timespec='seconds').replace(':','').replace('-','') + 'Z'
@@ -30,6 +36,10 @@ DEPLOYMENT_NAME = 'quickstart_deployment_' + iso_time
 # User entitled to workstations
 ENTITLE_USER = 'Administrator'
 
+# Seconds Anyware Manager instance listings are reused for while registering
+# the workstations, so that each workstation doesn't list all the instances
+AWM_CACHE_TTL = 60
+
 HOME               = os.path.expanduser('~')
 TERRAFORM_BIN_DIR  = os.path.join(HOME, 'bin')
 TERRAFORM_BIN_PATH = os.path.join(TERRAFORM_BIN_DIR, 'terraform')
@@ -47,6 +57,7 @@ SSH_KEY_PATH               = os.path.join(SECRETS_DIR, 'awm_admin_id_rsa')
 AWM_DEPLOYMENT_SA_KEY_PATH = os.path.join(SECRETS_DIR, 'awm_deployment_sa_key.json')
 AWS_SA_KEY_PATH            = os.path.join(SECRETS_DIR, 'aws_service_account_credentials')
 ARN_FILE_PATH              = os.path.join(SECRETS_DIR, 'arn.txt')
+JOURNAL_PATH               = os.path.join(SECRETS_DIR, 'quickstart_journal.json')
 
 # Setting paths for terraform.tfvars
 TF_VARS_REF_PATH = os.path.join(DEPLOYMENT_PATH, 'terraform.tfvars.sample')
@@ -59,6 +70,19 @@ AWS_USER_POLICY_ARN  = "arn:aws:iam::aws:policy/AdministratorAccess"
 # Types of workstations
 WS_TYPES = ['srock', 'grock', 'swin', 'gwin']
 
+# Terraform modules of the workstations mapped to their types, to add the
+# workstations to Anyware Manager as soon as Terraform creates them
+WS_MODULES = {
+    'module.rocky-std': 'srock',
+    'module.rocky-gfx': 'grock',
+    'module.win-std':   'swin',
+    'module.win-gfx':   'gwin',
+}
+
+# Set when running from a configuration file, to answer yes to all questions
+ASSUME_YES = False
+
+
 def ensure_requirements():
     ensure_required_packages()
     import_modules()
@@ -103,14 +127,12 @@ def ensure_required_packages():
         packages_to_install = " ".join(packages_to_install_list)
         install_cmd = f'{sys.executable} -m pip install --upgrade {packages_to_install} --user'
 
-        install_permission = input(
+        if not quickstart_config.answer_is_yes(
             'One or more of the following Python packages are outdated or missing:\n'
             f'  {packages_to_install}\n\n'
             'The script can install these packages in the user\'s home directory using the following command:\n' 
             f'  {install_cmd}\n'
-            'Proceed? (y/n)? ').strip().lower()
-
-        if install_permission not in ('y', 'yes'):
+            'Proceed? (y/n)? ', ASSUME_YES):
             print('Python packages are required for deployment. Exiting...')
             sys.exit(1)
 
@@ -129,6 +151,8 @@ def import_modules():
         import awm
         import aws_iam_wrapper as aws
         import interactive
+        import quickstart_steps
+        import terraform_stream
     '''
 
     # Recommended to clear cache after installing python packages for dynamic imports
@@ -172,11 +196,9 @@ def ensure_terraform():
             TERRAFORM_BIN_PATH = path
             return
 
-    install_permission = input(
+    if not quickstart_config.answer_is_yes(
         f'This system is missing Terraform version >= {required_version}.\n'
-        f'Proceed to download and install Terraform in {TERRAFORM_BIN_DIR} (y/n)? ').strip().lower()
-
-    if install_permission not in ('y', 'yes'):
+        f'Proceed to download and install Terraform in {TERRAFORM_BIN_DIR} (y/n)? ', ASSUME_YES):
         print('Terraform is required for deployment. Exiting...')
         sys.exit(1)
 
@@ -242,8 +264,7 @@ def ssh_key_create(path):
 def tf_vars_create(ref_file_path, tfvar_file_path, settings):
 
     if os.path.exists(tfvar_file_path):
-        overwrite = input("Found an existing .tfvar file, overwrite (y/n)? ").strip().lower()
-        if overwrite not in ('y', 'yes'):
+        if not quickstart_config.answer_is_yes("Found an existing .tfvar file, overwrite (y/n)? ", ASSUME_YES):
             print(f'{tfvar_file_path} already exists. Exiting...')
             sys.exit(1)
 
@@ -272,6 +293,12 @@ def tf_vars_create(ref_file_path, tfvar_file_path, settings):
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Creates an AWS single-connector deployment.')
+    parser.add_argument('--config', nargs='?', const=CFG_FILE_PATH, metavar='FILE',
+                        help=f'read the configurations from a YAML, JSON or "key: value" file instead of prompting for them (Default: {CFG_FILE_PATH})')
+    args = parser.parse_args()
+    ASSUME_YES = args.config is not None
+
     ensure_requirements()
 
     print('\nValidating AWS credentials...')
@@ -279,61 +306,122 @@ if __name__ == '__main__':
         exit(1)
     print("")
 
-    cfg_data = interactive.configurations_get(WS_TYPES, ENTITLE_USER, QUICKSTART_PATH)
-
-    print('\nPreparing local requirements...')
-
-    try:
-        print(f'Creating directory {SECRETS_DIR} to store secrets...')
-        os.mkdir(SECRETS_DIR, 0o700)
-    except FileExistsError:
-        print(f'Directory {SECRETS_DIR} already exists.')
-
-    ssh_key_create(SSH_KEY_PATH)
-
-    print('Local requirements setup complete.\n')
-
-    print('Setting Anyware Manager...')
-    my_awm = awm.AnywareManager(cfg_data.get('api_token'))
-
-    print(f'Creating deployment {DEPLOYMENT_NAME}...')
-    deployment = my_awm.deployment_create(DEPLOYMENT_NAME, cfg_data.get('reg_code'))
-    role_info  = my_awm.generate_aws_role_info(deployment)
-
-    print('Creating Anyware Manager API key...')
-    awm_deployment_key = my_awm.deployment_key_create(deployment)
-    with open(AWM_DEPLOYMENT_SA_KEY_PATH, 'w+') as keyfile:
-        keyfile.write(json.dumps(awm_deployment_key))
-    print('  Key written to ' + AWM_DEPLOYMENT_SA_KEY_PATH)
-    print('Anyware Manager setup complete.\n')
+    # Resume a run that failed from the steps it didn't finish. This is asked
+    # before the configurations, since the resources the run already created
+    # with its prefix are reused instead of being found to already exist.
+    journal = quickstart_steps.StepJournal(JOURNAL_PATH)
+    resume_prefix = None
+    if journal.steps_done():
+        journal_settings = (journal.value_get('prefix'), journal.value_get('aws_region'))
+        print(f'Found an incomplete run of deployment {journal.value_get("deployment_name")} with prefix "{journal_settings[0]}" in {journal_settings[1]}.')
+        if quickstart_config.answer_is_yes('Resume it with the same prefix and region (y/n)? ', ASSUME_YES):
+            resume_prefix = journal_settings[0]
+            DEPLOYMENT_NAME = journal.value_get('deployment_name')
+        else:
+            journal.remove()
+        print('')
+
+    if args.config:
+        cfg_data = interactive.configurations_load(args.config, WS_TYPES, ENTITLE_USER, QUICKSTART_PATH, resume_prefix)
+    else:
+        cfg_data = interactive.configurations_get(WS_TYPES, ENTITLE_USER, QUICKSTART_PATH, resume_prefix, ASSUME_YES)
 
-    print('Creating AWS user for Terraform deployment...')
     AWS_REGION       = cfg_data.get('aws_region')
     PREFIX           = cfg_data.get('prefix', '')
     AWS_USERNAME     = PREFIX + '-anyware-manager'
     AWS_ROLE_NAME    = f'{AWS_USERNAME}_role'
     ROLE_POLICY_NAME = f'{AWS_ROLE_NAME}_policy'
 
-    aws.create_user(AWS_USERNAME)
-    aws.attach_user_policy(AWS_USERNAME, AWS_USER_POLICY_ARN)
-    
-    print('Creating AWS role for Anyware Manager deployment...')
-    role                    = aws.create_role(AWS_ROLE_NAME, role_info['camAccountId'], role_info['externalId'])
-    role_policy_description = "Permissions to allow managing instances using Anyware Manager"
-    role_policy             = aws.create_policy(ROLE_POLICY_NAME, role_policy_description, ROLE_POLICY_DOCUMENT)
-    aws.attach_role_policy(AWS_ROLE_NAME, ROLE_POLICY_NAME)
-    
-    print('Creating AWS service account key for Terraform deployment...')
-    # This is done last because the number of keys a user can have is limited
-    # so if issues occur when creating other IAM resources, the key won't easily run out
-    sa_key_id = aws.service_account_create_key(AWS_USERNAME, AWS_SA_KEY_PATH)
-
-    print('Registering AWS role to Anyware Manager deployment...')
-    my_awm.deployment_add_aws_account(deployment, role.get('Arn'))
+    if resume_prefix and (PREFIX, AWS_REGION) != journal_settings:
+        print(f'The incomplete run can only be resumed with prefix "{journal_settings[0]}" in {journal_settings[1]}.')
+        print(f'Please run again with the same prefix and region, or delete {JOURNAL_PATH} to start over.')
+        sys.exit(1)
+    journal.value_set('deployment_name', DEPLOYMENT_NAME)
+    journal.value_set('prefix',          PREFIX)
+    journal.value_set('aws_region',      AWS_REGION)
+
+    my_awm = awm.AnywareManager(cfg_data.get('api_token'), cache_ttl=AWM_CACHE_TTL)
+
+    def secrets_dir_create():
+        try:
+            print(f'Creating directory {SECRETS_DIR} to store secrets...')
+            os.mkdir(SECRETS_DIR, 0o700)
+        except FileExistsError:
+            print(f'Directory {SECRETS_DIR} already exists.')
+
+    def deployment_create():
+        print(f'Creating deployment {DEPLOYMENT_NAME}...')
+        return my_awm.deployment_create(DEPLOYMENT_NAME, cfg_data.get('reg_code'))
+
+    def deployment_key_create(deployment, _):
+        print('Creating Anyware Manager API key...')
+        awm_deployment_key = my_awm.deployment_key_create(deployment)
+        with open(AWM_DEPLOYMENT_SA_KEY_PATH, 'w+') as keyfile:
+            keyfile.write(json.dumps(awm_deployment_key))
+        print('  Key written to ' + AWM_DEPLOYMENT_SA_KEY_PATH)
+        return awm_deployment_key
+
+    def key_read(path):
+        with open(path, 'r') as keyfile:
+            return json.load(keyfile)
+
+    def user_create():
+        print('Creating AWS user for Terraform deployment...')
+        aws.create_user(AWS_USERNAME)
+        aws.attach_user_policy(AWS_USERNAME, AWS_USER_POLICY_ARN)
+
+    def role_create(role_info):
+        print('Creating AWS role for Anyware Manager deployment...')
+        role = aws.create_role(AWS_ROLE_NAME, role_info['camAccountId'], role_info['externalId'])
+        # Only the ARN is returned, since the role can't be saved to the journal
+        return role.get('Arn')
+
+    def role_policy_create():
+        role_policy_description = "Permissions to allow managing instances using Anyware Manager"
+        aws.create_policy(ROLE_POLICY_NAME, role_policy_description, ROLE_POLICY_DOCUMENT)
+
+    def service_account_key_create(*_):
+        print('Creating AWS service account key for Terraform deployment...')
+        return aws.service_account_create_key(AWS_USERNAME, AWS_SA_KEY_PATH)
+
+    def deployment_aws_account_add(deployment, role_arn, _):
+        print('Registering AWS role to Anyware Manager deployment...')
+        my_awm.deployment_add_aws_account(deployment, role_arn)
+
+    # Steps that don't require each other run at the same time
+    print('\nSetting up local requirements, Anyware Manager and AWS...')
+    try:
+        results = quickstart_steps.steps_run({
+            'secrets_dir':            (secrets_dir_create, []),
+            'ssh_key':                (lambda _: ssh_key_create(SSH_KEY_PATH), ['secrets_dir']),
+            'deployment':             (deployment_create, []),
+            'role_info':              (my_awm.generate_aws_role_info, ['deployment']),
+            'deployment_key':         (deployment_key_create, ['deployment', 'secrets_dir']),
+            'user':                   (user_create, []),
+            'role':                   (role_create, ['role_info']),
+            'role_policy':            (role_policy_create, []),
+            'role_policy_attach':     (lambda *_: aws.attach_role_policy(AWS_ROLE_NAME, ROLE_POLICY_NAME), ['role', 'role_policy']),
+            # This is done last because the number of keys a user can have is limited
+            # so if issues occur when creating other IAM resources, the key won't easily run out
+            'service_account_key':    (service_account_key_create, ['user', 'role_policy_attach', 'secrets_dir']),
+            'deployment_aws_account': (deployment_aws_account_add, ['deployment', 'role', 'role_policy_attach']),
+            # Use the deployment key once the deployment is set up, which keeps the
+            # token refreshed for the rest of the script in case the API Token expires
+            'deployment_signin':      (lambda key, _: my_awm.deployment_signin(key), ['deployment_key', 'deployment_aws_account']),
+        }, journal=journal, always_run=['secrets_dir', 'deployment_signin'],
+        secret_steps={'deployment_key': lambda: key_read(AWM_DEPLOYMENT_SA_KEY_PATH)})
+    except quickstart_steps.StepError as e:
+        # The journal is kept, so that running the script again and resuming
+        # only runs the steps that didn't finish
+        print(f'ERROR: {e}')
+        print('Please run the script again and resume to finish the setup.')
+        sys.exit(1)
+    deployment = results['deployment']
+    sa_key_id  = results['service_account_key']
 
     # Newly created IAM access key needs to wait to avoid security token error
     time.sleep(5)
-    print('AWS setup complete.\n')
+    print('Local requirements, Anyware Manager and AWS setup complete.\n')
 
     print('Deploying with Terraform...')
     settings = {
@@ -353,55 +441,103 @@ if __name__ == '__main__':
     }
 
     # update tfvar
-    tf_vars_create(TF_VARS_REF_PATH, TF_VARS_PATH, settings)
+    journal.step_run('tf_vars', lambda: tf_vars_create(TF_VARS_REF_PATH, TF_VARS_PATH, settings))
     # Newly created tfvars files might need a few seconds to write
     time.sleep(5)
 
     os.chdir(DEPLOYMENT_PATH)
-    tf_cmd = f'{TERRAFORM_BIN_PATH} init'
-    subprocess.run(tf_cmd.split(' '), check=True)
 
-    tf_cmd = f'{TERRAFORM_BIN_PATH} apply -auto-approve'
-    subprocess.run(tf_cmd.split(' '), check=True)
+    hostnames = [f'{PREFIX}-{t}-{i}' for t in WS_TYPES for i in range(int(cfg_data.get(t)))]
+
+    def machine_add(hostname):
+        machine = my_awm.machine_add_existing(hostname, deployment, AWS_REGION)
+        journal.value_append('machines_added', hostname)
+        print(f'  Added "{hostname}" to Anyware Manager.')
+        return machine
+
+    def workstations_created(events):
+        machines_added = journal.value_get('machines_added', [])
+        for instance in terraform_stream.resources_created(events, 'aws_instance'):
+            ws_type = WS_MODULES.get(instance['module'])
+            hostname = f'{PREFIX}-{ws_type}-{instance["resource_key"]}'
+            if hostname in hostnames and hostname not in machines_added:
+                yield hostname
+
+    def terraform_apply():
+        tf_cmd = f'{TERRAFORM_BIN_PATH} init'
+        subprocess.run(tf_cmd.split(' '), check=True)
+
+        # Workstations are added to Anyware Manager as soon as they are created,
+        # while Terraform creates the rest of the deployment
+        events = terraform_stream.progress_print(terraform_stream.apply_events(TERRAFORM_BIN_PATH))
+        _, failed = quickstart_steps.pipeline_run(machine_add, workstations_created(events))
+        for hostname, e in failed.items():
+            print(f'  WARNING: Failed to add "{hostname}" to Anyware Manager, trying again after the deployment: {e}')
+
+        # The output is a list with the external IP of each Anyware Connector,
+        # which is empty if the Anyware Connector has no external IP
+        awc_public_ips = terraform_stream.outputs_get(TERRAFORM_BIN_PATH)['awc-public-ip']
+        return awc_public_ips[0] if awc_public_ips else None
 
-    comp_proc = subprocess.run([TERRAFORM_BIN_PATH,'output','awc-public-ip'],
-                               check=True,
-                               stdout=subprocess.PIPE)
-    awc_public_ip = comp_proc.stdout.decode().split('"')[1]
+    awc_public_ip = journal.step_run('terraform_apply', terraform_apply)
 
-    # Newly created AWS instances might need a few seconds to sync to Anyware Manager
-    time.sleep(10)
     print('Terraform deployment complete.\n')
 
-    # Add existing workstations
-    my_awm.deployment_signin(awm_deployment_key)
-    for t in WS_TYPES:
-        for i in range(int(cfg_data.get(t))):
-            hostname = f'{PREFIX}-{t}-{i}'
-            print(f'Adding "{hostname}" to Anyware Manager...')
-            my_awm.machine_add_existing(
-                hostname,
-                deployment,
-                AWS_REGION,
-            )
-
-    # Loop until Administrator user is found in Anyware Manager
-    while True:
-        entitle_user = my_awm.user_get(ENTITLE_USER, deployment)
-        if entitle_user:
-            break
+    # Add the workstations that were not added while Terraform was applying
+    machines_added = journal.value_get('machines_added', [])
+    remaining = [h for h in hostnames if h not in machines_added]
+    if remaining:
+        print(f'Adding {len(remaining)} workstations to Anyware Manager...')
+        added, failed = my_awm.machines_add_existing_bulk(
+            remaining,
+            deployment,
+            AWS_REGION,
+        )
+        for hostname in added:
+            journal.value_append('machines_added', hostname)
+            print(f'  Added "{hostname}" to Anyware Manager.')
+        for hostname, e in failed.items():
+            print(f'  ERROR: Failed to add "{hostname}" to Anyware Manager: {e}')
+        if failed:
+            print('Exiting script...')
+            sys.exit(1)
 
-        print(f'Waiting for user "{ENTITLE_USER}" to be synced. Retrying in 10 seconds...')
-        time.sleep(10)
+    print(f'Waiting for user "{ENTITLE_USER}" to be synced...')
+    try:
+        entitle_user, attempts, elapsed = my_awm.wait_for_user(ENTITLE_USER, deployment)
+    except TimeoutError as e:
+        print(f'ERROR: User "{ENTITLE_USER}" was not synced to Anyware Manager. {e}')
+        print('Exiting script...')
+        sys.exit(1)
+    print(f'  Found user "{ENTITLE_USER}" after {attempts} attempts in {elapsed:.0f} seconds.')
 
     # Add entitlements for each workstation
     machines_list = my_awm.machines_get(deployment)
-    for machine in machines_list:
-        print(f'Assigning workstation "{machine["machineName"]}" to user "{ENTITLE_USER}"...')
-        my_awm.entitlement_add(entitle_user, machine)
+    print(f'Assigning {len(machines_list)} workstations to user "{ENTITLE_USER}"...')
+    added, skipped, failed = my_awm.entitlements_add_bulk(entitle_user, machines_list)
+    machine_names = { m['machineId']: m['machineName'] for m in machines_list }
+    for machine_id in added:
+        print(f'  Assigned workstation "{machine_names[machine_id]}" to user "{ENTITLE_USER}".')
+    for machine_id in skipped:
+        print(f'  Workstation "{machine_names[machine_id]}" is already assigned to user "{ENTITLE_USER}".')
+    for machine_id, e in failed.items():
+        print(f'  ERROR: Failed to assign workstation "{machine_names[machine_id]}" to user "{ENTITLE_USER}": {e}')
+    if failed:
+        # The journal is kept, so that running the script again and resuming
+        # only assigns the workstations that failed
+        print('Please run the script again and resume to assign the remaining workstations.')
+        print('Exiting script...')
+        sys.exit(1)
+
+    # The run is complete, so running the script again creates a new deployment
+    journal.remove()
 
     print('\nQuickstart deployment finished.\n')
 
+    if not awc_public_ip:
+        print('WARNING: The Anyware Connector has no external IP address.')
+        awc_public_ip = 'its internal IP address'
+
     print('')
     next_steps = f"""
     Next steps:
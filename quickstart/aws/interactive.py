@@ -5,16 +5,25 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
+import argparse
 import aws_iam_wrapper as aws
 import boto3
 import awm
+import collections
+import concurrent.futures
 import getpass
 import math
+import os
 import re
 import sys
 import textwrap
+import time
 import yaml
 
+# The modules shared by the quickstarts live in shared/python
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'shared', 'python'))
+import quickstart_config
+
 DEFAULT_REGION      = "us-west-1"
 DEFAULT_NUMBEROF_WS = 0
 DEFAULT_PREFIX      = "quick"
@@ -44,20 +53,364 @@ SERVICE_QUOTA_REQUIREMENTS = {
     }
 }
 
-def configurations_get(ws_types, username, quickstart_path):
-    # AWS EC2 Client
-    ec2 = boto3.client('ec2')
+# Name of the quota mapped to the EC2 client method that lists the resources
+# currently in use and the name of the list within its response
+SERVICE_QUOTA_USAGE_QUERIES = {
+    "L-A4707A72": ('describe_internet_gateways', 'InternetGateways'),   # Internet gateways per Region
+    "L-FE5A380F": ('describe_nat_gateways', 'NatGateways'),             # NAT gateways per Availability Zone
+    "L-E79EC296": ('describe_security_groups', 'SecurityGroups'),       # VPC security groups per Region
+    "L-F678F1CE": ('describe_vpcs', 'Vpcs'),                            # VPCs per Region
+    "L-DF5E4CA3": ('describe_network_interfaces', 'NetworkInterfaces'), # Network interfaces per Region
+    "L-0263D0A3": ('describe_addresses', 'Addresses')                   # EC2-VPC Elastic IPs
+}
+
+# Name of the instance request quota mapped to the instance families it includes
+INSTANCE_REQUEST_FAMILIES = {
+    "L-34B43A08": ['a','c','d','h','i','m','r','t','z'], # All Standard (A, C, D, H, I, M, R, T, Z) Spot Instance Requests
+    "L-3819A6DF": ['g']                                   # All G and VT Spot Instance Requests
+}
+
+# Maximum number of AWS API calls made at the same time to get the service quotas
+QUOTA_API_WORKERS = 10
+
+# Maximum number of regions surveyed at the same time
+REGION_SURVEY_WORKERS = 16
+
+# Instances in these states use vCPUs of the instance request quotas
+INSTANCE_STATES_IN_USE = ['pending', 'running']
+
+# Maximum number of instance types in one describe_instance_types call
+INSTANCE_TYPES_PER_CALL = 100
+
+# Number of vCPUs of each instance type, per region. Instance types don't
+# change, so they are only described once per region.
+instance_type_vcpus = {}
+
+def instance_type_vcpus_get(ec2, aws_region, instance_types):
+    """Gets the number of vCPUs of instance types, describing the ones that
+    aren't cached yet in batches.
+
+    Args:
+        ec2 (EC2.Client): EC2 client of the region
+        aws_region (str): name of AWS region
+        instance_types (iterable of str): instance types (ex. t2.xlarge)
+
+    Returns:
+        dict: instance types mapped to their default number of vCPUs
+    """
+    cache = instance_type_vcpus.setdefault(aws_region, {})
+    missing = sorted(set(instance_types) - cache.keys())
+    paginator = ec2.get_paginator('describe_instance_types')
+    for i in range(0, len(missing), INSTANCE_TYPES_PER_CALL):
+        for page in paginator.paginate(InstanceTypes=missing[i:i + INSTANCE_TYPES_PER_CALL]):
+            for t in page['InstanceTypes']:
+                cache[t['InstanceType']] = t['VCpuInfo']['DefaultVCpus']
+
+    return { t: cache[t] for t in instance_types }
+
+def vcpus_in_use_get(ec2, aws_region):
+    """Counts the vCPUs in use in a region for each instance family, which is the
+    first letter of the instance type (i.e. 't' for t2.xlarge).
+
+    The instances are listed once, filtered by state by AWS, and the vCPUs of
+    all their distinct instance types are then looked up together.
+
+    Args:
+        ec2 (EC2.Client): EC2 client of the region
+        aws_region (str): name of AWS region
+
+    Returns:
+        collections.Counter: instance families mapped to the number of vCPUs in use
+    """
+    instance_types = collections.Counter()
+    paginator = ec2.get_paginator('describe_instances')
+    pages = paginator.paginate(
+        Filters=[{'Name': 'instance-state-name', 'Values': INSTANCE_STATES_IN_USE}]
+    )
+    for page in pages:
+        for reservation in page['Reservations']:
+            for instance in reservation['Instances']:
+                instance_types[instance['InstanceType']] += 1
+
+    vcpus = instance_type_vcpus_get(ec2, aws_region, instance_types)
+
+    count = collections.Counter()
+    for instance_type, numberof_instances in instance_types.items():
+        count[instance_type[0]] += vcpus[instance_type] * numberof_instances
+
+    return count
+
+class QuotaSnapshot:
+    """Service quota available in a region, fetched once and read from memory.
+
+    refresh() gets the quotas and their usage from AWS with concurrent calls.
+    The quota reserved for the resources selected so far is kept as deltas
+    that are subtracted from the available quota, so reserving doesn't call AWS.
+    """
+
+    def __init__(self, aws_region):
+        self.aws_region    = aws_region
+        self.ec2           = boto3.client('ec2', aws_region)
+        self.service_quota = boto3.client('service-quotas', aws_region)
+        self.available     = {}
+        self.reservations_clear()
+
+    def refresh(self):
+        """Gets the service quotas of the region and the number of resources in use."""
+        with concurrent.futures.ThreadPoolExecutor(max_workers=QUOTA_API_WORKERS) as executor:
+            values = { service: executor.submit(self._values_get, service) for service in SERVICE_QUOTA_REQUIREMENTS }
+            usage  = { r: executor.submit(self._usage_get, r) for r in SERVICE_QUOTA_USAGE_QUERIES }
+            vcpus_in_use = executor.submit(vcpus_in_use_get, self.ec2, self.aws_region)
+
+            available = {}
+            for service in SERVICE_QUOTA_REQUIREMENTS:
+                available[service] = {}
+                for r, value in values[service].result().items():
+                    if r in INSTANCE_REQUEST_FAMILIES:
+                        in_use = sum(vcpus_in_use.result()[f] for f in INSTANCE_REQUEST_FAMILIES[r])
+                    else:
+                        in_use = usage[r].result()
+                    available[service][r] = value - in_use
+
+        self.available = available
+        return self
+
+    def remaining(self, service, requirement):
+        return self.available[service][requirement] - self.reserved[service][requirement]
+
+    def requirements_met(self, requirements):
+        return all(requirements[service][r] <= self.remaining(service, r) for service in requirements for r in requirements[service])
 
+    def max_count_get(self, requirements, limit):
+        """Returns how many resources with the requirements fit in the remaining quota, up to limit."""
+        count = limit
+        for service in requirements:
+            for r in requirements[service]:
+                count = min(self.remaining(service, r) / requirements[service][r], count)
+        return max(math.floor(count), 0)
+
+    def reserve(self, requirements):
+        for service in requirements:
+            for r in requirements[service]:
+                self.reserved[service][r] += requirements[service][r]
+
+    def reservations_clear(self):
+        self.reserved = { service: { r: 0 for r in SERVICE_QUOTA_REQUIREMENTS[service] } for service in SERVICE_QUOTA_REQUIREMENTS }
+
+    def _values_get(self, service):
+        # Applied values of the quotas of the service (ex. vpc, ec2) that are requirements.
+        # Quotas that were never changed in the region might only have a default value.
+        values = {}
+        for method in ['list_service_quotas', 'list_aws_default_service_quotas']:
+            if values.keys() >= SERVICE_QUOTA_REQUIREMENTS[service].keys():
+                break
+            for page in self.service_quota.get_paginator(method).paginate(ServiceCode=service):
+                for q in page['Quotas']:
+                    if q['QuotaCode'] in SERVICE_QUOTA_REQUIREMENTS[service]:
+                        values.setdefault(q['QuotaCode'], q['Value'])
+
+        missing = SERVICE_QUOTA_REQUIREMENTS[service].keys() - values.keys()
+        if missing:
+            raise ValueError(f"Service quotas {', '.join(sorted(missing))} of {service} not found in {self.aws_region}.")
+        return values
+
+    def _usage_get(self, requirement):
+        method, query = SERVICE_QUOTA_USAGE_QUERIES[requirement]
+        if not self.ec2.can_paginate(method):
+            return len(getattr(self.ec2, method)()[query])
+        return sum(len(page[query]) for page in self.ec2.get_paginator(method).paginate())
+
+def machine_properties_get(quickstart_path):
     # TODO: Dynamically read the vars.tf terraform file instead
     with open(f"{quickstart_path}{MACHINE_PROPERTIES_YAML}", 'r') as f:
-        machine_properties = yaml.load(f, Loader=yaml.Loader)
+        return yaml.load(f, Loader=yaml.Loader)
+
+def regions_survey(ws_types, machine_properties):
+    """Checks the service quota of every region concurrently and computes how many
+    workstations of each type could be deployed in each region.
+
+    The quota required for the deployment, the Anyware Connector and the Domain
+    Controller is reserved first. The count of each workstation type is computed
+    on its own, so the counts of different types can't all be deployed together.
+
+    Args:
+        ws_types (list of str): workstation types (ex. srock)
+        machine_properties (dict): content of aws-machine-properties.yaml
+
+    Returns:
+        list of tuple: the name of each region, the workstation types mapped to the
+            maximum number that can be deployed or None if the deployment doesn't fit
+            in the region, and the error raised while checking the region if any,
+            sorted from the region that can deploy the most workstations
+    """
+    regions = [r['RegionName'] for r in boto3.client('ec2').describe_regions()['Regions']]
+    # Clients are created here since creating them isn't thread safe
+    snapshots = { region: QuotaSnapshot(region) for region in regions }
+
+    base_requirements = [SERVICE_QUOTA_REQUIREMENTS] + [machine_properties[m]['service_requirements'] for m in ['awc', 'dc']]
+
+    def max_counts_get(snapshot):
+        snapshot.refresh()
+        if not all(snapshot.requirements_met(r) for r in base_requirements):
+            return None
+        for r in base_requirements:
+            snapshot.reserve(r)
+        return { ws: snapshot.max_count_get(machine_properties[ws]['service_requirements'], MAX_SUBNET_IPS) for ws in ws_types }
+
+    results = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=REGION_SURVEY_WORKERS) as executor:
+        futures = { executor.submit(max_counts_get, snapshot): region for region, snapshot in snapshots.items() }
+        for future in concurrent.futures.as_completed(futures):
+            region = futures[future]
+            try:
+                results.append((region, future.result(), None))
+            # Record the error and carry on, so that one region that can't be
+            # checked, for example because a quota is missing from its service
+            # quotas, doesn't stop the survey of the others
+            except Exception as e:
+                results.append((region, None, e))
+
+    # Regions that can deploy the most workstations first, then the ones where
+    # the deployment doesn't fit, then the ones that couldn't be checked
+    def rank(result):
+        region, max_counts, error = result
+        if error:
+            return (2, 0, region)
+        if max_counts is None:
+            return (1, 0, region)
+        return (0, -sum(max_counts.values()), region)
+
+    return sorted(results, key=rank)
+
+def regions_survey_print(ws_types, machine_properties):
+    print("Checking the service quota of every AWS region...")
+    start = time.monotonic()
+    results = regions_survey(ws_types, machine_properties)
+    print(f"Checked {len(results)} regions in {time.monotonic() - start:.1f} seconds.\n")
+
+    print("Maximum number of workstations of each type that can be deployed in each region:")
+    print(("{:<16}" + " {:>6}" * len(ws_types)).format("REGION", *ws_types))
+    for region, max_counts, error in results:
+        if error:
+            print("{:<16} Could not check the service quota: {}".format(region, error))
+        elif max_counts is None:
+            print("{:<16} Not enough service quota for the Anyware Connector and Domain Controller".format(region))
+        else:
+            print(("{:<16}" + " {:>6}" * len(ws_types)).format(region, *(max_counts[ws] for ws in ws_types)))
+    print("\nThe number of each workstation type assumes no other workstations are deployed.")
+
+def configurations_load(cfg_file, ws_types, username, quickstart_path, resume_prefix=None):
+    """Reads the configurations from a file instead of prompting for them, and
+    validates all of them concurrently before the deployment starts.
+
+    Args:
+        cfg_file (str): path of the configuration file, see quickstart_config
+        ws_types (list of str): workstation types (ex. srock)
+        username (str): name of the Active Directory Administrator
+        quickstart_path (str): path of the AWS quickstart directory
+        resume_prefix (str): prefix of an incomplete run being resumed, whose
+            AWS IAM resources already exist and are reused
+
+    Returns:
+        cfg_data (dict): the same configurations returned by configurations_get
+    """
+    machine_properties = machine_properties_get(quickstart_path)
+
+    try:
+        cfg_data = quickstart_config.config_file_read(cfg_file)
+        cfg_data['aws_region'] = cfg_data.get('aws_region') or DEFAULT_REGION
+        cfg_data['prefix'] = cfg_data.get('prefix') or DEFAULT_PREFIX
+        for machine in ws_types:
+            cfg_data[machine] = quickstart_config.count_get(cfg_data, machine)
+        for key in ['reg_code', 'api_token', 'ad_password']:
+            if not cfg_data.get(key):
+                raise ValueError(f"{key} is missing.")
+    except (OSError, ValueError) as e:
+        print(f"Failed to read the configuration file {cfg_file}: {e}")
+        sys.exit(1)
+
+    aws_region = cfg_data['aws_region']
+    prefix     = cfg_data['prefix']
+
+    def reg_code_validate():
+        if not re.search(quickstart_config.REG_CODE_REGEX, cfg_data['reg_code'], re.IGNORECASE):
+            return "Invalid PCoIP Registration Code format (Ex. ABCDEFGHIJKL@0123-4567-89AB-CDEF)."
+
+    def api_token_validate():
+        if not awm.AnywareManager(cfg_data['api_token']).auth_token_validate():
+            return "Invalid Anyware Manager API token."
+
+    # Clients are created here since creating them isn't thread safe
+    ec2            = boto3.client('ec2')
+    quota_snapshot = QuotaSnapshot(aws_region)
+
+    def quota_validate():
+        regions = [r['RegionName'] for r in ec2.describe_regions()['Regions']]
+        if aws_region not in regions:
+            return f"{aws_region} is not one of the enabled regions: {', '.join(sorted(regions))}."
+
+        ws_count = sum(cfg_data[machine] for machine in ws_types)
+        if ws_count > MAX_SUBNET_IPS:
+            return f"There are only {MAX_SUBNET_IPS} available IP addresses in the 10.0.2.0/24 subnet for {ws_count} workstations."
+
+        quota_snapshot.refresh()
+        requirements = [SERVICE_QUOTA_REQUIREMENTS] + [machine_properties[m]['service_requirements'] for m in ['awc', 'dc']]
+        for machine in ws_types:
+            ws_service_req = machine_properties[machine]['service_requirements']
+            requirements.append({ service: { r: ws_service_req[service][r] * cfg_data[machine] for r in ws_service_req[service] } for service in ws_service_req })
+        for r in requirements:
+            quota_snapshot.reserve(r)
+
+        exceeded = [ f"{r} ({-quota_snapshot.remaining(service, r)} more required)" for service in quota_snapshot.reserved for r in quota_snapshot.reserved[service] if quota_snapshot.remaining(service, r) < 0 ]
+        if exceeded:
+            return f"Not enough service quota in {aws_region}: {', '.join(exceeded)}. To request to increase the quota, please see: https://docs.aws.amazon.com/general/latest/gr/aws_service_limits.html"
+
+    def prefix_validate():
+        if len(prefix) > 5:
+            return "Maximum 5 characters to avoid cropping of workstation hostnames."
+        if prefix == resume_prefix:
+            return None
+        aws_username = prefix + '-anyware-manager'
+        aws_role_name = f'{aws_username}_role'
+        role_policy_name = f'{aws_role_name}_policy'
+        if any((aws.find_user(aws_username), aws.find_role(aws_role_name), aws.find_policy(role_policy_name))):
+            return "AWS IAM resources must have unique names."
+
+    def ad_password_validate():
+        return quickstart_config.ad_password_error_get(cfg_data['ad_password'], username)
+
+    aws.set_boto3_region(aws_region)
+
+    print(f"Validating the configurations in {cfg_file}...")
+    errors = quickstart_config.validations_run({
+        'reg_code':    reg_code_validate,
+        'api_token':   api_token_validate,
+        'aws_region':  quota_validate,
+        'prefix':      prefix_validate,
+        'ad_password': ad_password_validate,
+    })
+    if errors:
+        quickstart_config.validation_errors_print(errors)
+        sys.exit(1)
+    print("The configurations are valid.")
+
+    return cfg_data
+
+def configurations_get(ws_types, username, quickstart_path, resume_prefix=None, assume_yes=False):
+    # AWS EC2 Client
+    ec2 = boto3.client('ec2')
+
+    machine_properties = machine_properties_get(quickstart_path)
+
+    # The prefix of the run being resumed is the default, since its IAM resources already exist
+    default_prefix = resume_prefix or DEFAULT_PREFIX
 
     def reg_code_get(order_number):
         print(f"{order_number}.  Please enter your PCoIP Registration Code.")
         print("    If you don't have one, visit: https://www.teradici.com/compare-plans.")
         while True:
             reg_code = input("reg_code: ").strip()
-            if re.search(r"^[0-9A-Z]{12}@([0-9A-F]{4}-){3}[0-9A-F]{4}$", reg_code, re.IGNORECASE):
+            if re.search(quickstart_config.REG_CODE_REGEX, reg_code, re.IGNORECASE):
                 return reg_code
             print("Invalid PCoIP Registration Code format (Ex. ABCDEFGHIJKL@0123-4567-89AB-CDEF). Please try again.")
 
@@ -73,137 +426,16 @@ def configurations_get(ws_types, username, quickstart_path):
                 return api_token
             print("\nInvalid Anyware Manager API token. Please try again.")
 
-    def service_quota_in_use_get(requirement, aws_region):
-        """AWS keeps track of the service quota limits, but to get the service quota usage, this function
-        makes different API calls based on the service quota and handles the response accordingly.
-
-        Args:
-            requirement (str): name of service quota requirement
-            aws_region (str): name of AWS region
-
-        Returns:
-            count (int): number of resources used for the requirement and in the region specified
-        """
-        def instance_requests_count(pattern):
-            """AWS keeps track of the number of vCPUs in use for each instance types. This function counts the 
-            total vCPUs that are used for the specified instance request service quota requirement, which could 
-            include multiple instance types.
-
-            Args:
-                pattern (list of char): instance types included in the instance request service quota requirement
-
-            Returns:
-                count (int): number of vCPUs in use for the instance request service quota requirement from all API responses
-            """
-            def vCPUs_count():
-                """This functions retrieves the list of instances currently deployed in the region, which is the Reservations list, 
-                and gets the instance type of each instance found, then matches the first character to the pattern (i.e. the first 
-                letter of instance type t2.xlarge is 't' and the pattern is a list of characters that could include 't'). If it is 
-                a match, it will then retrieve the vCPUs that is used by that instance type and add it to the count.
-
-                Returns:
-                    count (int): the number of vCPUs in use for the instance request quota from one API call response
-                """
-                count = 0
-                for i in response['Reservations']:
-                    instance_type = i['Instances'][0]['InstanceType']
-                    if instance_type[0] in pattern:
-                        count += ec2.describe_instance_types(InstanceTypes=[instance_type])['InstanceTypes'][0]['VCpuInfo']['DefaultVCpus']
-                return count
-
-            count = 0
-            response = ec2.describe_instances()
-            try:
-                count += vCPUs_count()
-                while response['NextToken']:
-                    response = ec2.describe_instances(
-                        NextToken=response['NextToken']
-                    )
-                    count += vCPUs_count(response['Reservations'][0])
-            except (IndexError, KeyError):
-                pass
-            return count
-
-        ec2 = boto3.client('ec2', aws_region)
-
-        # Name of the quota mapped to the function call to get the number of quota
-        # that is currently in use and the name of the list within the response 
-        # that contains the resources currently in use
-        QUOTA_CHECK_MAPPING = {
-            # Internet gateways per Region
-            'L-A4707A72': {
-                'function': ec2.describe_internet_gateways,
-                'query': 'InternetGateways'
-            },
-            # NAT gateways per Availability Zone
-            'L-FE5A380F': {
-                'function': ec2.describe_nat_gateways,
-                'query': 'NatGateways'
-            },
-            # VPC security groups per Region
-            'L-E79EC296': {
-                'function': ec2.describe_security_groups,
-                'query': 'SecurityGroups'
-            },
-            # VPCs per Region
-            'L-F678F1CE': {
-                'function': ec2.describe_vpcs,
-                'query': 'Vpcs'
-            },
-            # Network interfaces per Region
-            'L-DF5E4CA3': {
-                'function': ec2.describe_network_interfaces,
-                'query': 'NetworkInterfaces'
-            },
-            # EC2-VPC Elastic IPs
-            'L-0263D0A3': {
-                'function': ec2.describe_addresses,
-                'query': 'Addresses'
-            }
-        }
-
-        if requirement == "L-34B43A08": # All Standard (A, C, D, H, I, M, R, T, Z) Spot Instance Requests
-            return instance_requests_count(['a','c','d','h','i','m','r','t','z'])
-        if requirement == "L-3819A6DF": # All G and VT Spot Instance Requests
-            return instance_requests_count(['g'])
-
-        function = QUOTA_CHECK_MAPPING[requirement]['function']
-        query    = QUOTA_CHECK_MAPPING[requirement]['query']
-        response = function()
-        count    = len(response[query])
-        try:
-            while response['NextToken']:
-                response = function(NextToken={response['NextToken']})
-                count += len(response[query])
-        except KeyError:
-            pass
-        return count
-
-    # Gets the available quota for each service quota
-    def service_quota_get(aws_region):
-        # Set the API client region
-        service_quota = boto3.client('service-quotas', aws_region)
-        available_service_quota = {}
-        for service in SERVICE_QUOTA_REQUIREMENTS:
-            # This returns a dictionary object where one of the items with information such
-            # as the applied value of each quota that matches the service code (ex. vpc, ec2) 
-            service_quota_list = service_quota.list_service_quotas(
-                ServiceCode=service,
-                MaxResults=100
-            )['Quotas']
-            available_service_quota[service] = {}
-            for r in SERVICE_QUOTA_REQUIREMENTS[service]:
-                for q in service_quota_list:
-                    if r == q['QuotaCode']:
-                        available_service_quota[service][r] = q['Value'] - service_quota_in_use_get(r, aws_region)
-        return available_service_quota
+    # Gets the service quota snapshot of a region, which is only fetched the first time
+    def quota_snapshot_get(aws_region):
+        if aws_region not in quota_snapshots:
+            quota_snapshots[aws_region] = QuotaSnapshot(aws_region).refresh()
+        return quota_snapshots[aws_region]
 
     def service_quota_reserve(aws_region, requirements, verbose=True):
         if not requirements_are_met(aws_region, requirements, verbose):
             return False
-        for service in requirements:
-            for r in requirements[service]:
-                required_service_quota[service][r] += requirements[service][r]
+        quota_snapshot_get(aws_region).reserve(requirements)
         return True
 
     # Print options 1,2,3... and ask for a number input
@@ -242,12 +474,12 @@ def configurations_get(ws_types, username, quickstart_path):
             if verbose:
                 print(text, end="")
 
-        available_service_quota = service_quota_get(aws_region)
+        quota_snapshot = quota_snapshot_get(aws_region)
         error_response = ""
         limit_exceeded = False
         for service in requirements:
             for r in requirements[service]:
-                remaining_service_quota = available_service_quota[service][r] - required_service_quota[service][r]
+                remaining_service_quota = quota_snapshot.remaining(service, r)
                 if requirements[service][r] > remaining_service_quota:
                     # For clarity (ex. Required 4 vCPUs for All G and VT Spot Instance Requests but only 2 allowed)
                     if "Spot Instance Requests" in r:
@@ -276,13 +508,8 @@ def configurations_get(ws_types, username, quickstart_path):
             return 0
 
         # Calculate the maximum number of workstations the user can request with the available service quota
-        available_service_quota = service_quota_get(aws_region)
         ws_service_req = machine_properties[machine]['service_requirements']
-        for service in ws_service_req:
-            for r in ws_service_req[service]:
-                remaining_service_quota = available_service_quota[service][r] - required_service_quota[service][r]
-                max_numberof_ws = min(remaining_service_quota / ws_service_req[service][r], max_numberof_ws)
-        max_numberof_ws = math.floor(max_numberof_ws)
+        max_numberof_ws = quota_snapshot_get(aws_region).max_count_get(ws_service_req, max_numberof_ws)
         # Skip the prompt and set value to 0 if there's no more quota left
         if max_numberof_ws <= 0:
             set_to_zero(f"You don't have enough service quota to deploy any {machine_properties[machine]['name']}.")
@@ -310,10 +537,13 @@ def configurations_get(ws_types, username, quickstart_path):
     def prefix_get(aws_region):
         aws.set_boto3_region(aws_region)
         while True:
-            prefix = input("prefix: ").strip() or DEFAULT_PREFIX
+            prefix = input("prefix: ").strip() or default_prefix
             if (len(prefix) > 5):
                 print("Maximum 5 characters to avoid cropping of workstation hostnames. Please try again.")
                 continue
+            if prefix == resume_prefix:
+                print("Resuming the incomplete run with this prefix, its AWS IAM resources are reused.")
+                return prefix
             print('Checking that the AWS IAM resources names are unique...')
             aws_username = prefix + '-anyware-manager'
             aws_role_name = f'{aws_username}_role'
@@ -324,14 +554,6 @@ def configurations_get(ws_types, username, quickstart_path):
             print("Great, this prefix is unique!")
             return prefix
 
-    def answer_is_yes(prompt):
-        while True:
-            response = input(prompt).lower()
-            if response in ('y', 'yes'):
-                return True
-            if response in ('n', 'no'):
-                return False
-
     def ad_password_get(username):
         txt = r'''
         Please enter a password for the Active Directory Administrator.
@@ -363,42 +585,18 @@ def configurations_get(ws_types, username, quickstart_path):
         return password1
 
     def ad_password_validate(password, username):
-        # delimeters are specified in the microsoft documentation
-        username_parsed = re.split("[—,.\-\_#\s\t]", username)
-        for u in username_parsed:
-            if len(u) < 3:
-                continue
-            if re.search(u, password, re.IGNORECASE):
-                print("Password cannot contain username.", end=' ')
-                return False
-
-        if len(password) < 7:
-            print("Password must be at least 7 characters long.", end=' ')
+        error = quickstart_config.ad_password_error_get(password, username)
+        if error:
+            print(error, end=' ')
             return False
-
-        count = 0
-
-        # check lowercase, uppercase, digits, special characters
-        checks = ["[a-z]", "[A-Z]", "\d", "[@$!%*#?&]"]
-        for regex in checks:
-            if re.search(regex, password):
-                count += 1
-
-        # check unicode: if the password contains unicode characters, 
-        # it will change when encoded to utf-8 to one of [\u00d8-\u00f6]
-        if f'b\'{password}\'' != f'{password.encode("utf-8")}':
-            count += 1
-
-        if (count > 2):
-            return True
-        print("Password does not meet the complexity requirements.", end=' ')
-        return False
+        return True
 
     # Get configurations while loop
     while True:
         # Local shared variables
         cfg_data = {} # Dictionary that will be returned
         ws_count = 0 # Variable to keep track of workstations count
+        quota_snapshots = {} # Service quota snapshot of each region checked
 
         cfg_data['reg_code'] = reg_code_get("1")
         print("\n")
@@ -407,13 +605,12 @@ def configurations_get(ws_types, username, quickstart_path):
         print("\n")
 
         print(f"3.  The default region is {DEFAULT_REGION}.")
-        customize = not answer_is_yes("    Would you like to continue with the default selections (y/n)? ")
+        customize = not quickstart_config.answer_is_yes("    Would you like to continue with the default selections (y/n)? ", assume_yes)
 
         while True:
-            required_service_quota = { 
-                'vpc': { r: 0 for r in SERVICE_QUOTA_REQUIREMENTS['vpc'] },
-                'ec2': { r: 0 for r in SERVICE_QUOTA_REQUIREMENTS['ec2'] }
-            } # Dictionary to keep track of reserved service quota
+            # Start over the quota reserved in the region selected before
+            for quota_snapshot in quota_snapshots.values():
+                quota_snapshot.reservations_clear()
 
             if customize:
                 print("")
@@ -426,7 +623,8 @@ def configurations_get(ws_types, username, quickstart_path):
             print("")
             if region_requirements_met(cfg_data['aws_region']):
                 break
-            if not answer_is_yes("    Try another region (y/n)? "):
+            print("    To see the capacity of every region, run: python3 interactive.py --survey-regions")
+            if not quickstart_config.answer_is_yes("    Try another region (y/n)? ", assume_yes):
                 print("\nExiting script...")
                 sys.exit(1)
             customize = True
@@ -441,7 +639,7 @@ def configurations_get(ws_types, username, quickstart_path):
             index += 1
 
         print("\n")
-        print(f"5.  Add a prefix for the names of your IAM resources (Maximum 5 characters. Default: {DEFAULT_PREFIX}).")
+        print(f"5.  Add a prefix for the names of your IAM resources (Maximum 5 characters. Default: {default_prefix}).")
         cfg_data['prefix'] = prefix_get(cfg_data['aws_region'])
         print("\n")
 
@@ -452,10 +650,25 @@ def configurations_get(ws_types, username, quickstart_path):
         for variable, value in cfg_data.items():
             print("{:<10} {:<10}".format(variable, value))
 
-        if not answer_is_yes("\nWould you like to proceed with your selections (y/n)? "):
+        if not quickstart_config.answer_is_yes("\nWould you like to proceed with your selections (y/n)? ", assume_yes):
             print("\n") 
             continue # back to the beginning of the get configurations while loop
 
         print("")
         cfg_data['ad_password'] = ad_password_get(username)
         return cfg_data # Return to quickstart executable script
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Checks the AWS service quota for the quickstart deployment.")
+    parser.add_argument("--survey-regions", action="store_true", help="print how many workstations of each type can be deployed in every region")
+    args = parser.parse_args()
+
+    if not args.survey_regions:
+        parser.print_help()
+        sys.exit(1)
+
+    quickstart_path = os.path.dirname(os.path.abspath(__file__)) + '/'
+    machine_properties = machine_properties_get(quickstart_path)
+    ws_types = [m for m in machine_properties if m not in ['awc', 'dc']]
+    regions_survey_print(ws_types, machine_properties)
@@ -22,9 +22,16 @@ import time
 import awm
 import interactive
 
+# The modules shared by the quickstarts live in shared/python
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'shared', 'python'))
+import quickstart_config
+import quickstart_steps
+import terraform_stream
+
 REQUIRED_PACKAGES = {
     'google-api-python-client': None,
     'grpc-google-iam-v1': None,
+    'aiohttp': None,
 }
 
 # Service Account ID of the service account to create
@@ -48,6 +55,10 @@ REQUIRED_APIS = [
     'secretmanager.googleapis.com',
 ]
 
+# Maximum number of services enabled by one Service Usage batchEnable call
+SERVICES_BATCH_ENABLE_MAX        = 20
+SERVICES_OPERATION_POLL_INTERVAL = 2
+
 iso_time        = datetime.datetime.utcnow().isoformat(timespec='seconds').replace(':','').replace('-','') + 'Z'
 DEPLOYMENT_NAME = 'quickstart_deployment_' + iso_time
 CONNECTOR_NAME  = 'quickstart_awc_' + iso_time
@@ -69,10 +80,24 @@ SECRETS_DIR                = 'secrets'
 GCP_SA_KEY_PATH            = SECRETS_DIR + '/gcp_service_account_key.json'
 SSH_KEY_PATH               = SECRETS_DIR + '/awm_admin_id_rsa'
 AWM_DEPLOYMENT_SA_KEY_PATH = SECRETS_DIR + '/awm_deployment_sa_key.json.encrypted'
+JOURNAL_PATH               = SECRETS_DIR + '/quickstart_journal.json'
 
 # Types of workstations
 WS_TYPES = ['scent', 'gcent', 'swin', 'gwin']
 
+# Terraform modules of the workstations mapped to their types, to add the
+# workstations to Anyware Manager as soon as Terraform creates them
+WS_MODULES = {
+    'module.centos-std': 'scent',
+    'module.centos-gfx': 'gcent',
+    'module.win-std':    'swin',
+    'module.win-gfx':    'gwin',
+}
+
+# Set when running from a configuration file, to answer yes to all questions
+ASSUME_YES = False
+
+
 def ensure_requirements():
     if not PROJECT_ID:
         print('The PROJECT property has not been set.')
@@ -120,14 +145,12 @@ def ensure_required_packages():
         packages_to_install = " ".join(packages_to_install_list)
         install_cmd = f'{sys.executable} -m pip install --upgrade {packages_to_install} --user'
 
-        install_permission = input(
+        if not quickstart_config.answer_is_yes(
             'One or more of the following Python packages are outdated or missing:\n'
             f'  {packages_to_install}\n\n'
             'The script can install these packages in the user\'s home directory using the following command:\n' 
             f'  {install_cmd}\n'
-            'Proceed? (y/n)? ').strip().lower()
-
-        if install_permission not in ('y', 'yes'):
+            'Proceed? (y/n)? ', ASSUME_YES):
             print('Python packages are required for deployment. Exiting...')
             sys.exit(1)
 
@@ -189,11 +212,9 @@ def ensure_terraform():
             TERRAFORM_BIN_PATH = path
             return
 
-    install_permission = input(
+    if not quickstart_config.answer_is_yes(
         f'This system is missing Terraform version >= {required_version}.\n'
-        f'Proceed to download and install Terraform in {TERRAFORM_BIN_DIR} (y/n)? ').strip().lower()
-
-    if install_permission not in ('y', 'yes'):
+        f'Proceed to download and install Terraform in {TERRAFORM_BIN_DIR} (y/n)? ', ASSUME_YES):
         print('Terraform is required for deployment. Exiting...')
         sys.exit(1)
 
@@ -201,20 +222,6 @@ def ensure_terraform():
     subprocess.run(install_cmd.split(' '), check=True)
 
 
-def quickstart_config_read(cfg_file):
-    cfg_data = {}
-
-    with open(cfg_file, 'r') as f:
-        for line in f:
-            if line[0] in ('#', '\n'):
-                continue
-
-            key, value = map(str.strip, line.split(':'))
-            cfg_data[key] = value
-
-    return cfg_data
-
-
 def service_account_find(email):
     service_accounts = iam_service.projects().serviceAccounts().list(
         name = f'projects/{PROJECT_ID}',
@@ -316,12 +323,56 @@ def iam_policy_update(service_account, roles):
 
 
 def apis_enable(apis):
-    print('Enabling APIs:')
+    """A function that enables the APIs that are not enabled yet in the project.
+
+    The enabled APIs are listed once, and the missing ones are enabled with a
+    single batchEnable operation instead of one gcloud command per API.
+
+    Args:
+        apis (list): names of the APIs to enable
+    """
+
+    print('Enabling APIs...')
+    serviceusage = googleapiclient.discovery.build('serviceusage', 'v1')
+    parent       = f'projects/{PROJECT_ID}'
+
+    enabled = set()
+    request = serviceusage.services().list(
+        parent   = parent,
+        filter   = 'state:ENABLED',
+        fields   = 'nextPageToken,services/config/name',
+        pageSize = 200,
+    )
+    while request is not None:
+        response = request.execute()
+        enabled.update(s['config']['name'] for s in response.get('services', []))
+        request = serviceusage.services().list_next(request, response)
+
+    missing = [api for api in apis if api not in enabled]
+    if not missing:
+        print('  All required APIs are already enabled.')
+        return
+
+    for i in range(0, len(missing), SERVICES_BATCH_ENABLE_MAX):
+        batch = missing[i:i + SERVICES_BATCH_ENABLE_MAX]
+        for api in batch:
+            print(f'  {api}...')
+
+        operation = serviceusage.services().batchEnable(
+            parent = parent,
+            body   = {'serviceIds': batch},
+        ).execute()
+
+        while not operation.get('done'):
+            time.sleep(SERVICES_OPERATION_POLL_INTERVAL)
+            operation = serviceusage.operations().get(name=operation['name']).execute()
+
+        if 'error' in operation:
+            print(f'ERROR: Failed to enable APIs: {operation["error"].get("message")}')
+            sys.exit(1)
+
+    print(f'  Enabled {len(missing)} APIs.')
 
-    # Using shell command, no Python Google Cloud Client library support
-    for api in apis:
-        print(f'  {api}...')
-        subprocess.run(['gcloud', 'services', 'enable', api], check=True)
 
 def disable_default_sink():
     subprocess.run(['gcloud', 'logging', 'sinks', 'update', '_Default', '--disabled'], check=True)
@@ -338,8 +389,7 @@ def ssh_key_create(path):
 def tf_vars_create(ref_file_path, tfvar_file_path, settings):
 
     if os.path.exists(tfvar_file_path):
-        overwrite = input("Found an existing .tfvar file, overwrite (y/n)? ").strip().lower()
-        if overwrite not in ('y', 'yes'):
+        if not quickstart_config.answer_is_yes("Found an existing .tfvar file, overwrite (y/n)? ", ASSUME_YES):
             print(f'{tfvar_file_path} already exists. Exiting...')
             sys.exit(1)
 
@@ -360,6 +410,12 @@ def tf_vars_create(ref_file_path, tfvar_file_path, settings):
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Creates a GCP single-connector deployment.')
+    parser.add_argument('--config', nargs='?', const=CFG_FILE_PATH, metavar='FILE',
+                        help=f'read the configurations from a YAML, JSON or "key: value" file instead of prompting for them (Default: {CFG_FILE_PATH})')
+    args = parser.parse_args()
+    ASSUME_YES = args.config is not None
+
     ensure_requirements()
 
     apis_enable(REQUIRED_APIS)
@@ -369,55 +425,105 @@ if __name__ == '__main__':
     # bucket created by Terraform and _Default log bucket.
     disable_default_sink()
 
-    cfg_data = interactive.configurations_get(PROJECT_ID, WS_TYPES, ENTITLE_USER)
+    # Resume a run that failed from the steps it didn't finish. This is asked
+    # before the configurations, since the resources the run already created
+    # with its prefix are reused instead of being found to already exist.
+    journal = quickstart_steps.StepJournal(os.path.abspath(f'../../{DEPLOYMENT_PATH}/{JOURNAL_PATH}'))
+    resume_prefix = None
+    if journal.steps_done():
+        journal_settings = (journal.value_get('prefix'), journal.value_get('gcp_zone'))
+        print(f'Found an incomplete run of deployment {journal.value_get("deployment_name")} with prefix "{journal_settings[0]}" in {journal_settings[1]}.')
+        if quickstart_config.answer_is_yes('Resume it with the same prefix and zone (y/n)? ', ASSUME_YES):
+            resume_prefix = journal_settings[0]
+            DEPLOYMENT_NAME = journal.value_get('deployment_name')
+        else:
+            journal.remove()
+        print('')
+
+    if args.config:
+        cfg_data = interactive.configurations_load(args.config, PROJECT_ID, WS_TYPES, ENTITLE_USER, resume_prefix)
+    else:
+        cfg_data = interactive.configurations_get(PROJECT_ID, WS_TYPES, ENTITLE_USER, resume_prefix, ASSUME_YES)
 
-    print('Setting GCP project...')
     iam_service = googleapiclient.discovery.build('iam', 'v1')
     crm_service = googleapiclient.discovery.build('cloudresourcemanager', 'v1')
 
     prefix = cfg_data.get('prefix')
 
-    sa = service_account_create(PROJECT_ID, SA_ID, prefix)
-    iam_policy_update(sa, SA_ROLES)
-
-    print('GCP project setup complete.\n')
+    if resume_prefix and (prefix, cfg_data.get('gcp_zone')) != journal_settings:
+        print(f'The incomplete run can only be resumed with prefix "{journal_settings[0]}" in {journal_settings[1]}.')
+        print(f'Please run again with the same prefix and zone, or delete {journal.path} to start over.')
+        sys.exit(1)
+    journal.value_set('deployment_name', DEPLOYMENT_NAME)
+    journal.value_set('prefix',          prefix)
+    journal.value_set('gcp_zone',        cfg_data.get('gcp_zone'))
 
-    print('Preparing local requirements...')
     os.chdir(f"../../{DEPLOYMENT_PATH}")
     # Paths passed into terraform.tfvars should be absolute paths
     cwd = os.getcwd() + '/'
 
-    try:
-        print(f'Creating directory {SECRETS_DIR} to store secrets...')
-        os.mkdir(SECRETS_DIR, 0o700)
-    except FileExistsError:
-        print(f'Directory {SECRETS_DIR} already exists.')
+    my_awm = awm.AnywareManager(cfg_data.get('api_token'))
 
-    ssh_key_create(SSH_KEY_PATH)
+    def secrets_dir_create():
+        try:
+            print(f'Creating directory {SECRETS_DIR} to store secrets...')
+            os.mkdir(SECRETS_DIR, 0o700)
+        except FileExistsError:
+            print(f'Directory {SECRETS_DIR} already exists.')
 
-    print('Local requirements setup complete.\n')
+    def deployment_create():
+        print(f'Creating deployment {DEPLOYMENT_NAME}...')
+        return my_awm.deployment_create(DEPLOYMENT_NAME, cfg_data.get('reg_code'))
 
-    print('Setting Anyware Manager...')
-    my_awm = awm.AnywareManager(cfg_data.get('api_token'))
-    # TODO: Add a proper clean up of GCP IAM resources so we don't have to move the
-    # service account creation to here after the rest of the GCP setup
-    sa_key = service_account_create_key(sa, GCP_SA_KEY_PATH)
+    def deployment_key_create(deployment, _):
+        print('Creating Anyware Manager API key...')
+        awm_deployment_key = my_awm.deployment_key_create(deployment)
 
-    print(f'Creating deployment {DEPLOYMENT_NAME}...')
-    deployment = my_awm.deployment_create(DEPLOYMENT_NAME, cfg_data.get('reg_code'))
-    my_awm.deployment_add_gcp_account(sa_key, deployment)
+        print('Creating Anyware Manager Deployment Service Account Key...')
+        with open(AWM_DEPLOYMENT_SA_KEY_PATH, 'wb+') as keyfile:
+            json_data = json.dumps(awm_deployment_key).encode('utf-8')
+            keyfile.write(json_data)
 
-    print('Creating Anyware Manager API key...')
-    awm_deployment_key = my_awm.deployment_key_create(deployment)
+        print('  Key written to ' + AWM_DEPLOYMENT_SA_KEY_PATH)
+        return awm_deployment_key
 
-    print('Anyware Manager setup complete.\n')
+    def key_read(path):
+        with open(path, 'r') as keyfile:
+            return json.load(keyfile)
 
-    print('Creating Anyware Manager Deployment Service Account Key...')
-    with open(AWM_DEPLOYMENT_SA_KEY_PATH, 'wb+') as keyfile:
-        json_data = json.dumps(awm_deployment_key).encode('utf-8')
-        keyfile.write(json_data)
+    # Steps that don't require each other run at the same time
+    print('Setting up the GCP project, local requirements and Anyware Manager...')
+    try:
+        results = quickstart_steps.steps_run({
+            'service_account':        (lambda: service_account_create(PROJECT_ID, SA_ID, prefix), []),
+            'iam_policy':             (lambda sa: iam_policy_update(sa, SA_ROLES), ['service_account']),
+            'secrets_dir':            (secrets_dir_create, []),
+            'ssh_key':                (lambda _: ssh_key_create(SSH_KEY_PATH), ['secrets_dir']),
+            # TODO: Add a proper clean up of GCP IAM resources so we don't have to create
+            # the service account key after the rest of the GCP setup
+            'service_account_key':    (lambda sa, *_: service_account_create_key(sa, GCP_SA_KEY_PATH),
+                                       ['service_account', 'iam_policy', 'secrets_dir']),
+            'deployment':             (deployment_create, []),
+            'deployment_gcp_account': (lambda sa_key, deployment: my_awm.deployment_add_gcp_account(sa_key, deployment),
+                                       ['service_account_key', 'deployment']),
+            'deployment_key':         (deployment_key_create, ['deployment', 'secrets_dir']),
+            # Use the deployment key once the deployment is set up, which keeps the
+            # token refreshed for the rest of the script in case the API Token expires
+            'deployment_signin':      (lambda key, _: my_awm.deployment_signin(key), ['deployment_key', 'deployment_gcp_account']),
+        }, journal=journal, always_run=['secrets_dir', 'deployment_signin'],
+        secret_steps={
+            'service_account_key': lambda: key_read(GCP_SA_KEY_PATH),
+            'deployment_key':      lambda: key_read(AWM_DEPLOYMENT_SA_KEY_PATH),
+        })
+    except quickstart_steps.StepError as e:
+        # The journal is kept, so that running the script again and resuming
+        # only runs the steps that didn't finish
+        print(f'ERROR: {e}')
+        print('Please run the script again and resume to finish the setup.')
+        sys.exit(1)
+    deployment = results['deployment']
 
-    print('  Key written to ' + AWM_DEPLOYMENT_SA_KEY_PATH)
+    print('GCP project, local requirements and Anyware Manager setup complete.\n')
 
     print('Deploying with Terraform...')
 
@@ -441,61 +547,103 @@ if __name__ == '__main__':
     }
 
     # update tfvar
-    tf_vars_create(TF_VARS_REF_PATH, TF_VARS_PATH, settings)
-
-    tf_cmd = f'{TERRAFORM_BIN_PATH} init'
-    subprocess.run(tf_cmd.split(' '), check=True)
-
-    tf_cmd = f'{TERRAFORM_BIN_PATH} apply -auto-approve'
-    subprocess.run(tf_cmd.split(' '), check=True)
-
-    comp_proc = subprocess.run([TERRAFORM_BIN_PATH,'output','awc-public-ip'],
-                               check=True,
-                               stdout=subprocess.PIPE)
-    awc_public_ip = comp_proc.stdout.decode().split('"')[1]
+    journal.step_run('tf_vars', lambda: tf_vars_create(TF_VARS_REF_PATH, TF_VARS_PATH, settings))
+
+    hostnames = [f'{prefix}-{t}-{i}' for t in WS_TYPES for i in range(int(cfg_data.get(t)))]
+    hostnames.append(f'{prefix}-vm-dc')
+
+    def machine_add(hostname):
+        machine = my_awm.machine_add_existing(hostname, PROJECT_ID, cfg_data.get('gcp_zone'), deployment)
+        journal.value_append('machines_added', hostname)
+        print(f'  Added "{hostname}" to Anyware Manager.')
+        return machine
+
+    def machines_created(events):
+        machines_added = journal.value_get('machines_added', [])
+        for instance in terraform_stream.resources_created(events, 'google_compute_instance'):
+            if instance['module'] == 'module.dc':
+                hostname = f'{prefix}-vm-dc'
+            else:
+                hostname = f'{prefix}-{WS_MODULES.get(instance["module"])}-{instance["resource_key"]}'
+            if hostname in hostnames and hostname not in machines_added:
+                yield hostname
+
+    def terraform_apply():
+        tf_cmd = f'{TERRAFORM_BIN_PATH} init'
+        subprocess.run(tf_cmd.split(' '), check=True)
+
+        # Machines are added to Anyware Manager as soon as they are created,
+        # while Terraform creates the rest of the deployment
+        events = terraform_stream.progress_print(terraform_stream.apply_events(TERRAFORM_BIN_PATH))
+        _, failed = quickstart_steps.pipeline_run(machine_add, machines_created(events))
+        for hostname, e in failed.items():
+            print(f'  WARNING: Failed to add "{hostname}" to Anyware Manager, trying again after the deployment: {e}')
+
+        # The output is a list with the external IP of each Anyware Connector,
+        # which is empty if the Anyware Connector has no external IP
+        awc_public_ips = terraform_stream.outputs_get(TERRAFORM_BIN_PATH)['awc-public-ip']
+        return awc_public_ips[0] if awc_public_ips else None
+
+    awc_public_ip = journal.step_run('terraform_apply', terraform_apply)
 
     print('Terraform deployment complete.\n')
 
-    # To update the auth_token used by the session header for the API call
-    # with the one from the deployment key in case the API Token expires
-    my_awm.deployment_signin(awm_deployment_key)
-    # Add existing workstations
-    for t in WS_TYPES:
-        for i in range(int(cfg_data.get(t))):
-            hostname = f'{prefix}-{t}-{i}'
-            print(f'Adding "{hostname}" to Anyware Manager...')
-            my_awm.machine_add_existing(
-                hostname,
-                PROJECT_ID,
-                cfg_data.get('gcp_zone'),
-                deployment
-            )
-
-    print(f'Adding DC to Anyware Manager...')
-    my_awm.machine_add_existing(
-        f'{prefix}-vm-dc',
-        PROJECT_ID,
-        cfg_data.get('gcp_zone'),
-        deployment
-    )
-
-    # Loop until Administrator user is found in Anyware Manager
-    while True:
-        entitle_user = my_awm.user_get(ENTITLE_USER, deployment)
-        if entitle_user:
-            break
+    # Add the workstations and the DC that were not added while Terraform was applying
+    machines_added = journal.value_get('machines_added', [])
+    remaining = [h for h in hostnames if h not in machines_added]
+    if remaining:
+        print(f'Adding {len(remaining)} machines to Anyware Manager...')
+        added, failed = my_awm.machines_add_existing_bulk(
+            remaining,
+            PROJECT_ID,
+            cfg_data.get('gcp_zone'),
+            deployment
+        )
+        for hostname in added:
+            journal.value_append('machines_added', hostname)
+            print(f'  Added "{hostname}" to Anyware Manager.')
+        for hostname, e in failed.items():
+            print(f'  ERROR: Failed to add "{hostname}" to Anyware Manager: {e}')
+        if failed:
+            print('Exiting script...')
+            sys.exit(1)
 
-        print(f'Waiting for user "{ENTITLE_USER}" to be synced. Retrying in 10 seconds...')
-        time.sleep(10)
+    print(f'Waiting for user "{ENTITLE_USER}" to be synced...')
+    try:
+        entitle_user, attempts, elapsed = my_awm.wait_for_user(ENTITLE_USER, deployment)
+    except TimeoutError as e:
+        print(f'ERROR: User "{ENTITLE_USER}" was not synced to Anyware Manager. {e}')
+        print('Exiting script...')
+        sys.exit(1)
+    print(f'  Found user "{ENTITLE_USER}" after {attempts} attempts in {elapsed:.0f} seconds.')
 
     # Add entitlements for each workstation
     machines_list = my_awm.machines_get(deployment)
-    for machine in machines_list:
-        print(f'Assigning workstation "{machine["machineName"]}" to user "{ENTITLE_USER}"...')
-        my_awm.entitlement_add(entitle_user, machine)
+    print(f'Assigning {len(machines_list)} workstations to user "{ENTITLE_USER}"...')
+    added, skipped, failed = my_awm.entitlements_add_bulk(entitle_user, machines_list)
+    machine_names = { m['machineId']: m['machineName'] for m in machines_list }
+    for machine_id in added:
+        print(f'  Assigned workstation "{machine_names[machine_id]}" to user "{ENTITLE_USER}".')
+    for machine_id in skipped:
+        print(f'  Workstation "{machine_names[machine_id]}" is already assigned to user "{ENTITLE_USER}".')
+    for machine_id, e in failed.items():
+        print(f'  ERROR: Failed to assign workstation "{machine_names[machine_id]}" to user "{ENTITLE_USER}": {e}')
+    if failed:
+        # The journal is kept, so that running the script again and resuming
+        # only assigns the workstations that failed
+        print('Please run the script again and resume to assign the remaining workstations.')
+        print('Exiting script...')
+        sys.exit(1)
+
+    # The run is complete, so running the script again creates a new deployment
+    journal.remove()
 
     print('\nQuickstart deployment finished.\n')
 
+    if not awc_public_ip:
+        print('WARNING: The Anyware Connector has no external IP address.')
+        awc_public_ip = 'its internal IP address'
+
     print('')
     next_steps = f"""
     Next steps:
@@ -5,15 +5,21 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
+import argparse
 import awm
 import getpass
 import googleapiclient.discovery
 import json
 import math
+import os
 import re
 import sys
 import textwrap
 
+# The modules shared by the quickstarts live in shared/python
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'shared', 'python'))
+import quickstart_config
+
 # Name of Compute Engine metrics
 METRICS = [
     "INSTANCES",
@@ -34,7 +40,214 @@ DEFAULT_PREFIX      = "quick"
 # see: https://cloud.google.com/vpc/docs/vpc#reserved_ip_addresses_in_every_subnet
 MAX_SUBNET_IPS = 250
 
-def configurations_get(project_id, ws_types, username):
+def zones_survey(cpe_service, project_id, ws_types, machine_properties):
+    """Computes how many workstations of each type every zone of the project can host.
+
+    The quotas of all regions come from one regions().list call and the accelerators
+    of all zones from one acceleratorTypes().aggregatedList call. The quota of the
+    Anyware Connector and Domain Controller is set aside in each region first, and
+    the count of each workstation type is computed on its own, so the counts of
+    different types can't all be deployed together.
+
+    Args:
+        cpe_service (googleapiclient.discovery.Resource): Compute Engine API service
+        project_id (str): ID of the GCP project
+        ws_types (list of str): workstation types (ex. scent)
+        machine_properties (dict): content of gcp-machine-properties.json
+
+    Returns:
+        list of tuple: the name of each zone, its region, and the workstation types
+            mapped to the maximum number that can be deployed, or None if the
+            Anyware Connector and Domain Controller don't fit in the region, sorted
+            from the zone that can host the most workstations
+    """
+    regions = []
+    request = cpe_service.regions().list(project=project_id)
+    while request is not None:
+        response = request.execute()
+        regions += response.get('items', [])
+        request = cpe_service.regions().list_next(previous_request=request, previous_response=response)
+
+    # Zone names mapped to the names of the accelerators available in the zone
+    accelerators = {}
+    request = cpe_service.acceleratorTypes().aggregatedList(project=project_id)
+    while request is not None:
+        response = request.execute()
+        for scope, scoped_list in response.get('items', {}).items():
+            accelerators[scope.split("/")[-1]] = { a['name'] for a in scoped_list.get('acceleratorTypes', []) }
+        request = cpe_service.acceleratorTypes().aggregatedList_next(previous_request=request, previous_response=response)
+
+    def spec_vector(machine):
+        return [ machine_properties[machine]['spec'][m] for m in METRICS ]
+
+    base_spec = [ awc + dc for awc, dc in zip(spec_vector("awc"), spec_vector("dc")) ]
+
+    results = []
+    for region in regions:
+        # Metrics without a quota in the region, such as GPUs not offered there, have none available
+        limits = { q['metric']: q['limit'] - q['usage'] for q in region['quotas'] }
+        available = [ limits.get(m, 0) - base for m, base in zip(METRICS, base_spec) ]
+
+        for zone in region['zones']:
+            zone = zone.split("/")[-1]
+            if min(available) < 0:
+                results.append((zone, region['name'], None))
+                continue
+
+            max_counts = {}
+            for ws in ws_types:
+                accelerator = machine_properties[ws]['accelerator']
+                if accelerator and accelerator not in accelerators.get(zone, set()):
+                    max_counts[ws] = 0
+                    continue
+                ratios = [ a / spec for a, spec in zip(available, spec_vector(ws)) if spec != 0 ]
+                max_counts[ws] = math.floor(min(ratios + [MAX_SUBNET_IPS]))
+            results.append((zone, region['name'], max_counts))
+
+    # Zones that can host the most workstations first, then the ones where the
+    # Anyware Connector and Domain Controller don't fit
+    def rank(result):
+        zone, region, max_counts = result
+        if max_counts is None:
+            return (1, 0, zone)
+        return (0, -sum(max_counts.values()), zone)
+
+    return sorted(results, key=rank)
+
+def zones_survey_print(project_id, ws_types, machine_properties):
+    print(f"Checking the Compute Engine quota and accelerators of every zone in project {project_id}...\n")
+    cpe_service = googleapiclient.discovery.build('compute', 'v1')
+    results = zones_survey(cpe_service, project_id, ws_types, machine_properties)
+
+    print("Maximum number of workstations of each type that can be deployed in each zone:")
+    print(("{:<28}" + " {:>6}" * len(ws_types)).format("ZONE", *ws_types))
+    for zone, region, max_counts in results:
+        if max_counts is None:
+            print("{:<28} Not enough quota in {} for the Anyware Connector and Domain Controller".format(zone, region))
+        else:
+            print(("{:<28}" + " {:>6}" * len(ws_types)).format(zone, *(max_counts[ws] for ws in ws_types)))
+    print("\nThe number of each workstation type assumes no other workstations are deployed in the region.")
+
+def configurations_load(cfg_file, project_id, ws_types, username, resume_prefix=None):
+    """Reads the configurations from a file instead of prompting for them, and
+    validates all of them concurrently before the deployment starts.
+
+    Args:
+        cfg_file (str): path of the configuration file, see quickstart_config
+        project_id (str): ID of the GCP project
+        ws_types (list of str): workstation types (ex. scent)
+        username (str): name of the Active Directory Administrator
+        resume_prefix (str): prefix of an incomplete run being resumed, whose
+            VPC might already exist and is reused
+
+    Returns:
+        cfg_data (dict): the same configurations returned by configurations_get
+    """
+    with open(MACHINE_PROPERTIES_JSON, 'r') as f:
+        machine_properties = json.load(f)
+
+    try:
+        cfg_data = quickstart_config.config_file_read(cfg_file)
+        cfg_data['gcp_region'] = cfg_data.get('gcp_region') or DEFAULT_REGION
+        cfg_data['gcp_zone'] = cfg_data.get('gcp_zone') or DEFAULT_ZONE
+        cfg_data['prefix'] = cfg_data.get('prefix') or DEFAULT_PREFIX
+        for machine in ws_types:
+            cfg_data[machine] = quickstart_config.count_get(cfg_data, machine)
+        for key in ['reg_code', 'api_token', 'ad_password']:
+            if not cfg_data.get(key):
+                raise ValueError(f"{key} is missing.")
+    except (OSError, ValueError) as e:
+        print(f"Failed to read the configuration file {cfg_file}: {e}")
+        sys.exit(1)
+
+    gcp_region = cfg_data['gcp_region']
+    gcp_zone   = cfg_data['gcp_zone']
+    prefix     = cfg_data['prefix']
+
+    # The Compute Engine API service isn't thread safe, so each validation builds its own
+    def cpe_service_build():
+        return googleapiclient.discovery.build('compute', 'v1')
+
+    def reg_code_validate():
+        if not re.search(quickstart_config.REG_CODE_REGEX, cfg_data['reg_code'], re.IGNORECASE):
+            return "Invalid PCoIP Registration Code format (Ex. ABCDEFGHIJKL@0123-4567-89AB-CDEF)."
+
+    def api_token_validate():
+        if not awm.AnywareManager(cfg_data['api_token']).auth_token_validate():
+            return "Invalid Anyware Manager API token."
+
+    def quota_validate():
+        regions = cpe_service_build().regions().list(project=project_id, filter=f'name={gcp_region}').execute().get('items', [])
+        if not regions:
+            return f"{gcp_region} is not a region of project {project_id}."
+        if not any(z.split("/")[-1] == gcp_zone for z in regions[0]['zones']):
+            return f"{gcp_zone} is not a zone of region {gcp_region}."
+
+        ws_count = sum(cfg_data[machine] for machine in ws_types)
+        if ws_count > MAX_SUBNET_IPS:
+            return f"There are only {MAX_SUBNET_IPS} available IP addresses in the 10.0.2.0/24 subnet for {ws_count} workstations."
+
+        available = { q['metric']: q['limit'] - q['usage'] for q in regions[0]['quotas'] }
+        numbers = { 'awc': 1, 'dc': 1, **{ machine: cfg_data[machine] for machine in ws_types } }
+        exceeded = []
+        for m in METRICS:
+            required = sum(n * machine_properties[machine]['spec'][m] for machine, n in numbers.items())
+            if required > available.get(m, 0):
+                exceeded.append(f"{m} (required {required}, {available.get(m, 0)} available)")
+        if exceeded:
+            return f"Not enough Compute Engine quota in {gcp_region}: {', '.join(exceeded)}. To request to increase the quota, please see: https://console.cloud.google.com/iam-admin/quotas"
+
+    def accelerators_validate():
+        cpe_service = cpe_service_build()
+        missing = []
+        for machine in ws_types:
+            accelerator_name = machine_properties[machine]['accelerator']
+            if cfg_data[machine] == 0 or accelerator_name == "":
+                continue
+            accelerator_resource = cpe_service.acceleratorTypes().list(
+                project=project_id,
+                zone=gcp_zone,
+                filter=f"name={accelerator_name}"
+            ).execute()
+            if "items" not in accelerator_resource.keys():
+                missing.append(f"{accelerator_name} for {machine_properties[machine]['name']} ({machine})")
+        if missing:
+            return f"Accelerators not available in zone {gcp_zone}: {', '.join(missing)}. To check the availability, see: https://cloud.google.com/compute/docs/gpus/gpu-regions-zones"
+
+    def prefix_validate():
+        if len(prefix) > 5:
+            return "Prefix should have a maximum of 5 characters to avoid cropping of workstation hostnames."
+        if prefix == resume_prefix:
+            return None
+        cpe_service = cpe_service_build()
+        vpc_name = f'{prefix}-vpc-anyware'
+        request = cpe_service.networks().list(project=project_id)
+        while request is not None:
+            response = request.execute()
+            if vpc_name in [item['name'] for item in response.get('items', [])]:
+                return f"{vpc_name} already exists. Please use a different prefix."
+            request = cpe_service.networks().list_next(previous_request=request, previous_response=response)
+
+    def ad_password_validate():
+        return quickstart_config.ad_password_error_get(cfg_data['ad_password'], username)
+
+    print(f"Validating the configurations in {cfg_file}...")
+    errors = quickstart_config.validations_run({
+        'reg_code':    reg_code_validate,
+        'api_token':   api_token_validate,
+        'gcp_region':  quota_validate,
+        'gcp_zone':    accelerators_validate,
+        'prefix':      prefix_validate,
+        'ad_password': ad_password_validate,
+    })
+    if errors:
+        quickstart_config.validation_errors_print(errors)
+        sys.exit(1)
+    print("The configurations are valid.")
+
+    return cfg_data
+
+def configurations_get(project_id, ws_types, username, resume_prefix=None, assume_yes=False):
     # GCP Compute Engine API
     cpe_service = googleapiclient.discovery.build('compute', 'v1')
 
@@ -47,7 +260,7 @@ def configurations_get(project_id, ws_types, username):
         print("    If you don't have one, visit: https://www.teradici.com/compare-plans.")
         while True:
             reg_code = input("reg_code: ").strip()
-            if re.search(r"^[0-9A-Z]{12}@([0-9A-F]{4}-){3}[0-9A-F]{4}$", reg_code, re.IGNORECASE):
+            if re.search(quickstart_config.REG_CODE_REGEX, reg_code, re.IGNORECASE):
                 return reg_code
             print("Invalid PCoIP Registration Code format (Ex. ABCDEFGHIJKL@0123-4567-89AB-CDEF). Please try again.")
 
@@ -123,7 +336,7 @@ def configurations_get(project_id, ws_types, username):
             if requirements_are_met(machine, 1, gcp_region, gcp_zone=""):
                 cpe_quota_reserve(machine, 1, gcp_region, gcp_zone="")
                 continue
-            if not answer_is_yes("Try another region (y/n)? "):
+            if not quickstart_config.answer_is_yes("Try another region (y/n)? ", assume_yes):
                 print("Exiting script...")
                 sys.exit(1)
             return False
@@ -242,14 +455,19 @@ def configurations_get(project_id, ws_types, username):
         return vpc_list
 
     def prefix_get(order_number):
-        print(f"{order_number}.  Prefix to add to the names of resources to be created (Maximum 5 characters. Default: {DEFAULT_PREFIX}).")
+        # The prefix of the run being resumed is the default, since its VPC might already exist
+        default_prefix = resume_prefix or DEFAULT_PREFIX
+        print(f"{order_number}.  Prefix to add to the names of resources to be created (Maximum 5 characters. Default: {default_prefix}).")
 
         vpc_list = vpc_list_get()
         while True:
-            prefix = input("prefix: ").strip() or DEFAULT_PREFIX
+            prefix = input("prefix: ").strip() or default_prefix
             if (len(prefix) > 5):
                 print("    Prefix should have a maximum of 5 characters to avoid cropping of workstation hostnames. Please try again.")
                 continue
+            if prefix == resume_prefix:
+                print("    Resuming the incomplete run with this prefix, its resources are reused.")
+                return prefix
 
             vpc_name = f'{prefix}-vpc-anyware'
             if vpc_name in vpc_list:
@@ -257,14 +475,6 @@ def configurations_get(project_id, ws_types, username):
                 continue
             return prefix
 
-    def answer_is_yes(prompt):
-        while True:
-            response = input(prompt).lower()
-            if response in ('y', 'yes'):
-                return True
-            if response in ('n', 'no'):
-                return False
-
     def ad_password_get(username):
         txt = r'''
         Please enter a password for the Active Directory Administrator.
@@ -296,36 +506,11 @@ def configurations_get(project_id, ws_types, username):
         return password1
 
     def ad_password_validate(password, username):
-        # delimeters are specified in the microsoft documentation
-        username_parsed = re.split("[—,.\-\_#\s\t]", username)
-        for u in username_parsed:
-            if len(u) < 3:
-                continue
-            if re.search(u, password, re.IGNORECASE):
-                print("Password cannot contain username.", end=' ')
-                return False
-
-        if len(password) < 7:
-            print("Password must be at least 7 characters long.", end=' ')
+        error = quickstart_config.ad_password_error_get(password, username)
+        if error:
+            print(error, end=' ')
             return False
-
-        count = 0
-
-        # check lowercase, uppercase, digits, special characters
-        checks = ["[a-z]", "[A-Z]", "\d", "[@$!%*#?&]"]
-        for regex in checks:
-            if re.search(regex, password):
-                count += 1
-
-        # check unicode: if the password contains unicode characters,
-        # it will change when encoded to utf-8 to one of [\u00d8-\u00f6]
-        if f'b\'{password}\'' != f'{password.encode("utf-8")}':
-            count += 1
-
-        if (count > 2):
-            return True
-        print("Password does not meet the complexity requirements.", end=' ')
-        return False
+        return True
 
     # Get configurations while loop
     while True:
@@ -344,7 +529,7 @@ def configurations_get(project_id, ws_types, username):
         print("\n")
 
         print(f"4.  The default region is {DEFAULT_REGION} and the default zone is {DEFAULT_ZONE}.")
-        customize = not answer_is_yes("    Would you like to continue with the default selections (y/n)? ")
+        customize = not quickstart_config.answer_is_yes("    Would you like to continue with the default selections (y/n)? ", assume_yes)
 
         # GCP Region and Zone while loop
         while True:
@@ -377,7 +562,7 @@ def configurations_get(project_id, ws_types, username):
             for machine in ws_types:
                 requirements_are_met(machine, 0, cfg_data['gcp_region'], cfg_data['gcp_zone'], print_cpe_report=False, print_gpu_report=True)
 
-            if answer_is_yes(f"\nWould you like to continue with region {cfg_data['gcp_region']} and zone {cfg_data['gcp_zone']} (y/n)? "):
+            if quickstart_config.answer_is_yes(f"\nWould you like to continue with region {cfg_data['gcp_region']} and zone {cfg_data['gcp_zone']} (y/n)? ", assume_yes):
                 break # break out of the GCP region and zone while loop
             customize = True
 
@@ -399,10 +584,25 @@ def configurations_get(project_id, ws_types, username):
         for variable, value in cfg_data.items():
             print("{:<10} {:<10}".format(variable, value))
 
-        if not answer_is_yes("\nWould you like to proceed with your selections (y/n)? "):
+        if not quickstart_config.answer_is_yes("\nWould you like to proceed with your selections (y/n)? ", assume_yes):
             print("\n")
             continue # back to the beginning of the get configurations while loop
 
         print("")
         cfg_data['ad_password'] = ad_password_get(username)
         return cfg_data # Return to quickstart executable script
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Checks the Compute Engine quota for the quickstart deployment.")
+    parser.add_argument("--survey-zones", action="store_true", help="print how many workstations of each type can be deployed in every zone")
+    parser.add_argument("--project", default=os.environ.get('GOOGLE_CLOUD_PROJECT'), help="ID of the GCP project (Default: the Cloud Shell project)")
+    args = parser.parse_args()
+
+    if not args.survey_zones or not args.project:
+        parser.print_help()
+        sys.exit(1)
+
+    with open(MACHINE_PROPERTIES_JSON, 'r') as f:
+        machine_properties = json.load(f)
+    ws_types = [m for m in machine_properties if m not in ['awc', 'dc']]
+    zones_survey_print(args.project, ws_types, machine_properties)
@@ -0,0 +1,39 @@
+# © Copyright 2026 HP Development Company, L.P.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""Anyware Manager API client.
+
+The client for each cloud provider is only imported when it is requested, so
+using the GCP client never imports the AWS dependencies and vice versa:
+
+    import anyware_manager
+
+    my_awm = anyware_manager.client_create('gcp', api_token)
+
+The asynchronous client is in anyware_manager.aio, which requires aiohttp.
+"""
+
+import importlib
+
+from .auth import TokenManager
+from .client import AnywareManager
+from .utils import bulk_run, wait_until
+
+# Cloud provider mapped to the module and class name of its client
+PROVIDERS = {
+    'aws': ('.aws', 'AwsAnywareManager'),
+    'gcp': ('.gcp', 'GcpAnywareManager'),
+}
+
+
+def client_class_get(provider):
+    module_name, class_name = PROVIDERS[provider]
+    module = importlib.import_module(module_name, __name__)
+
+    return getattr(module, class_name)
+
+
+def client_create(provider, *args, **kwargs):
+    return client_class_get(provider)(*args, **kwargs)
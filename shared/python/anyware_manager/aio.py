@@ -0,0 +1,271 @@
+# © Copyright 2026 HP Development Company, L.P.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""Asynchronous Anyware Manager API client.
+
+AsyncAnywareManager has the same methods as the synchronous AnywareManager
+clients, as coroutines, so that many calls can be in flight on one event loop:
+
+    async with AsyncAnywareManager(api_token) as my_awm:
+        await my_awm.deployment_signin(awm_deployment_key)
+        machines = await asyncio.gather(*[
+            my_awm.machine_add_existing(name, deployment, 'gcp', project_id=project_id, zone=zone)
+            for name in names
+        ])
+
+The payloads and the paging are built by the same functions as the synchronous
+clients, and requests are retried with the same policy as awm_transport.
+"""
+
+import asyncio
+
+import aiohttp
+
+import awm_transport
+
+from . import client_class_get
+from .client import (
+    DEFAULT_PAGE_SIZE,
+    connector_payload,
+    deployment_key_payload,
+    deployment_payload,
+    entitlement_payload,
+    page_next_offset,
+    page_params,
+    signin_payload,
+)
+
+# Maximum number of requests sent to Anyware Manager at the same time
+DEFAULT_MAX_CONCURRENCY = 100
+
+
+class AsyncAnywareManager:
+    def __init__(self, auth_token, url='https://cas.teradici.com',
+                 verify_certificate=True, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 retries=awm_transport.DEFAULT_RETRIES,
+                 backoff_factor=awm_transport.DEFAULT_BACKOFF_FACTOR):
+        self.auth_token = auth_token
+        self.url = url
+        self.verify_certificate = verify_certificate
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        # Set by deployment_signin and used to sign in again when the token expires
+        self.deployment_key = None
+        self.session = None
+        # Created by open() so that they belong to the running event loop
+        self._semaphore = None
+        self._signin_lock = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def open(self):
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._signin_lock = asyncio.Lock()
+
+        connect_timeout, read_timeout = awm_transport.DEFAULT_TIMEOUT
+        self.session = aiohttp.ClientSession(
+            connector = aiohttp.TCPConnector(
+                limit = self.max_concurrency,
+                # Option to disable verification to avoid validation errors
+                # from self-signed certificates as may be used by Anyware Manager
+                ssl = None if self.verify_certificate else False,
+            ),
+            timeout = aiohttp.ClientTimeout(
+                sock_connect = connect_timeout,
+                sock_read = read_timeout,
+            ),
+        )
+
+    async def close(self):
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    async def _request(self, method, path, idempotent=False, **kwargs):
+        """Sends a request to Anyware Manager and returns the JSON response.
+
+        If the request is rejected because the token has expired and the client
+        has signed in with a deployment key, it signs in again and replays the
+        request once.
+        """
+        async with self._semaphore:
+            auth_token = self.auth_token
+            try:
+                return await self._send(method, path, auth_token, idempotent, **kwargs)
+            except aiohttp.ClientResponseError as e:
+                if e.status != 401 or not self.deployment_key:
+                    raise
+
+            await self._signin_refresh(auth_token)
+
+            return await self._send(method, path, self.auth_token, idempotent, **kwargs)
+
+    async def _send(self, method, path, auth_token=None, idempotent=False, **kwargs):
+        """Sends a request, retried as by awm_transport.session_create(), and returns the JSON response.
+
+        Requests with an idempotent method, or marked idempotent since they
+        are safe to send again, are retried up to self.retries times on
+        responses with a status in awm_transport.RETRY_STATUS_CODES and on
+        connection errors, after the delay in the Retry-After header or the
+        backoff delay.
+        """
+        retry_allowed = awm_transport.retry_allowed(method, idempotent)
+        headers = { 'authorization': auth_token } if auth_token else {}
+        retry   = 0
+
+        while True:
+            retry += 1
+            retry_after = None
+            try:
+                async with self.session.request(
+                    method,
+                    self.url + path,
+                    headers = headers,
+                    **kwargs
+                ) as resp:
+                    if (resp.status not in awm_transport.RETRY_STATUS_CODES
+                            or not retry_allowed
+                            or retry > self.retries):
+                        resp.raise_for_status()
+                        return await resp.json()
+
+                    if resp.status in awm_transport.RETRY_AFTER_STATUS_CODES:
+                        retry_after = resp.headers.get('Retry-After')
+            except aiohttp.ClientConnectionError:
+                if not retry_allowed or retry > self.retries:
+                    raise
+
+            await asyncio.sleep(awm_transport.retry_delay_get(retry, retry_after, self.backoff_factor))
+
+    async def _signin_refresh(self, expired_token):
+        # Only the first of the requests rejected with the same token signs in
+        # again, the others wait for it and then use the new token.
+        async with self._signin_lock:
+            if self.auth_token == expired_token:
+                await self.deployment_signin(self.deployment_key)
+
+    async def _iter_pages(self, path, params, page_size):
+        offset = 0
+        while offset is not None:
+            resp = await self._request(
+                'GET',
+                path,
+                params = page_params(params, offset, page_size),
+            )
+            offset = page_next_offset(resp, offset)
+
+            for item in resp.get('data', []):
+                yield item
+
+    async def auth_token_validate(self):
+        try:
+            await self._request('POST', '/api/v1/auth/verify', idempotent=True)
+            return True
+        except aiohttp.ClientResponseError as e:
+            if e.status == 401:
+                return False
+            raise
+
+    async def deployment_create(self, name, reg_code):
+        resp = await self._request(
+            'POST',
+            '/api/v1/deployments',
+            json = deployment_payload(name, reg_code),
+        )
+
+        return resp['data']
+
+    async def deployment_key_create(self, deployment, name='sa-key-1'):
+        resp = await self._request(
+            'POST',
+            '/api/v1/auth/keys',
+            json = deployment_key_payload(deployment, name),
+        )
+
+        return resp['data']
+
+    async def connector_create(self, name, deployment):
+        resp = await self._request(
+            'POST',
+            '/api/v1/auth/tokens/connector',
+            json = connector_payload(name, deployment),
+        )
+
+        return resp['data']
+
+    async def deployment_signin(self, awm_deployment_key):
+        # Not sent through _request so that signing in again doesn't wait for
+        # a free slot held by one of the requests that triggered it
+        resp = await self._send(
+            'POST',
+            '/api/v1/auth/signin',
+            idempotent = True,
+            json = signin_payload(awm_deployment_key),
+        )
+
+        self.auth_token = resp['data']['token']
+        self.deployment_key = awm_deployment_key
+
+    async def machine_add_existing(self, name, deployment, provider, **provider_details):
+        """Adds an existing machine to Anyware Manager.
+
+        Args:
+            name (str): name of the machine
+            deployment (dict): Anyware Manager deployment to add the machine to
+            provider (str): cloud provider of the machine, 'gcp' or 'aws'
+            provider_details: the other arguments of machine_payload() of the
+                client of the provider, project_id and zone for GCP, or
+                instance_id and region for AWS
+
+        Returns:
+            dict: the machine added
+        """
+        machine_details = client_class_get(provider).machine_payload(
+            name, deployment=deployment, **provider_details)
+
+        resp = await self._request(
+            'POST',
+            '/api/v1/machines',
+            json = machine_details,
+        )
+
+        return resp['data']
+
+    async def entitlement_add(self, user, machine):
+        resp = await self._request(
+            'POST',
+            '/api/v1/machines/entitlements',
+            json = entitlement_payload(user, machine),
+        )
+
+        return resp['data']
+
+    async def user_get(self, name, deployment):
+        resp = await self._request(
+            'GET',
+            '/api/v1/machines/entitlements/adusers',
+            params = {
+                'deploymentId': deployment['deploymentId'],
+                'name': name,
+            },
+        )
+
+        return resp['data'][0] if len(resp.get('data', [])) >= 1 else None
+
+    async def machines_get(self, deployment):
+        return [m async for m in self.iter_machines(deployment)]
+
+    def iter_machines(self, deployment, page_size=DEFAULT_PAGE_SIZE):
+        return self._iter_pages(
+            '/api/v1/machines',
+            { 'deploymentId': deployment['deploymentId'] },
+            page_size,
+        )
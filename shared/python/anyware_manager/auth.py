@@ -0,0 +1,127 @@
+# © Copyright 2026 HP Development Company, L.P.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import threading
+import time
+
+import awm_tokens
+import requests
+
+# Number of seconds before a token expires to sign in again, which is the
+# same margin the token cache uses so both stop using a token at the same time
+REFRESH_MARGIN = awm_tokens.TOKEN_EXPIRY_MARGIN
+
+# Number of seconds to wait before trying again when signing in in the
+# background fails
+REFRESH_RETRY_DELAY = 30
+
+
+class TokenManager(requests.auth.AuthBase):
+    """Authenticates the requests of a session with the Anyware Manager token.
+
+    Once signin is set, the token is refreshed in the background shortly before
+    it expires. A request rejected with 401 signs in again and is sent once more
+    with the new token. Signing in is serialized, so when many threads get a 401
+    with the same token at the same time, only the first one signs in and the
+    others reuse its token.
+    """
+
+    def __init__(self, token, signin=None, refresh_margin=REFRESH_MARGIN):
+        """
+        Args:
+            token (str): Anyware Manager token to authenticate requests with
+            signin (function): function called without arguments that signs in
+                and returns a new token, or None if the token can't be refreshed
+            refresh_margin (float): number of seconds before the token expires
+                to sign in again
+        """
+        self.token          = token
+        self.signin         = signin
+        self.refresh_margin = refresh_margin
+
+        self._lock  = threading.Lock()
+        self._timer = None
+
+    def __call__(self, request):
+        request.headers['authorization'] = self.token
+        request.register_hook('response', self._handle_401)
+
+        return request
+
+    def refresh(self, expired_token=None):
+        """Signs in again, unless another thread already replaced expired_token.
+
+        Args:
+            expired_token (str): the token that was found to be expired, or None
+                to sign in again regardless
+
+        Returns:
+            str: the current token
+        """
+        with self._lock:
+            if expired_token is None or expired_token == self.token:
+                self.token = self.signin()
+                self._refresh_schedule()
+
+            return self.token
+
+    def stop(self):
+        """Stops refreshing the token in the background."""
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+
+    def _refresh_schedule(self, delay=None):
+        # Called with self._lock held
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+        expiry = awm_tokens.token_expiry_get(self.token)
+        if self.signin is None or expiry is None:
+            return
+
+        if delay is None:
+            delay = max(expiry - self.refresh_margin - time.time(), 0)
+
+        # A daemon thread, so that a pending refresh doesn't keep the script running
+        self._timer = threading.Timer(delay, self._refresh_background, args=(self.token,))
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _refresh_background(self, token):
+        try:
+            self.refresh(token)
+        # Keep the current token, which is still valid for up to refresh_margin
+        # seconds, and try again later. Requests rejected meanwhile sign in again
+        # through _handle_401.
+        except requests.exceptions.RequestException:
+            with self._lock:
+                if token == self.token:
+                    self._refresh_schedule(REFRESH_RETRY_DELAY)
+
+    def _handle_401(self, resp, **kwargs):
+        request = resp.request
+        if (resp.status_code != 401 or self.signin is None
+                or getattr(request, 'awm_token_replayed', False)):
+            return resp
+
+        token = self.refresh(request.headers.get('authorization'))
+
+        # Release the connection of the rejected response before sending the
+        # request again, as done by requests.auth.HTTPDigestAuth
+        resp.content
+        resp.close()
+
+        replay = request.copy()
+        replay.headers['authorization'] = token
+        replay.awm_token_replayed = True
+
+        replay_resp = resp.connection.send(replay, **kwargs)
+        replay_resp.history.append(resp)
+        replay_resp.request = replay
+
+        return replay_resp
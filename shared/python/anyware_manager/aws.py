@@ -0,0 +1,149 @@
+# © Copyright 2026 HP Development Company, L.P.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from retry import retry
+
+from .client import MAX_CONCURRENT_REQUESTS, AnywareManager
+from .utils import bulk_run, wait_until
+
+# Maximum number of seconds to wait for newly created AWS instances to be
+# listed by Anyware Manager
+INSTANCE_SYNC_TIMEOUT = 120
+
+INSTANCES_PATH = '/api/v1/machines/cloudproviders/aws/instances'
+
+
+class AwsAnywareManager(AnywareManager):
+    """Anyware Manager API client for deployments of AWS machines."""
+
+    def generate_aws_role_info(self, deployment):
+        deployment_id = deployment['deploymentId']
+        resp = self.session.get(
+            self.url + f'/api/v1/deployments/{deployment_id}/cloudServiceAccounts/awsRole',
+        )
+        resp.raise_for_status()
+
+        return resp.json()['data']
+
+    #Might need a few tries before successfully registered
+    @retry(tries=5,delay=5)
+    def deployment_add_aws_account(self, deployment, role_arn):
+        deployment_id = deployment['deploymentId']
+        payload = {
+            'provider': 'aws',
+            'credential': {
+                'roleArn': role_arn
+            }
+        }
+        resp = self.session.post(
+            self.url + f'/api/v1/deployments/{deployment_id}/cloudServiceAccounts',
+            json = payload,
+        )
+        #Solving the 412 Client Error is what the retry is for
+        resp.raise_for_status()
+
+    @staticmethod
+    def machine_payload(name, deployment, instance_id, region):
+        return {
+            'machineName':  name,
+            'deploymentId': deployment['deploymentId'],
+            'provider':     'aws',
+            'instanceId':   instance_id,
+            'region':       region,
+        }
+
+    def machine_add_existing(self, name, deployment, region, instance_index=None):
+        """Adds an existing AWS instance to Anyware Manager.
+
+        Args:
+            name (str): name of the instance
+            deployment (dict): Anyware Manager deployment to add the machine to
+            region (str): AWS region of the instance
+            instance_index (dict): instance names mapped to instance IDs, as
+                returned by instance_index(), to avoid listing the instances
+
+        Returns:
+            dict: the Anyware Manager machine added
+        """
+        instance_id = (instance_index or {}).get(name)
+        if not instance_id:
+            # Newly created AWS instances might need a few seconds to sync to Anyware Manager
+            instance_ids, _, _ = wait_until(
+                lambda: self.instance_id_get(deployment, region, name),
+                INSTANCE_SYNC_TIMEOUT,
+            )
+            instance_id = instance_ids[0]
+
+        resp = self.session.post(
+            self.url + '/api/v1/machines',
+            json = self.machine_payload(name, deployment, instance_id, region),
+        )
+        resp.raise_for_status()
+        self._cache_invalidate('/api/v1/machines')
+
+        return resp.json()['data']
+
+    def machines_add_existing_bulk(self, names, deployment, region,
+                                   max_workers=MAX_CONCURRENT_REQUESTS):
+        """Adds existing AWS instances to Anyware Manager concurrently.
+
+        The instances are listed once and looked up by name for every machine.
+        Instances missing from the listing, such as ones not synced to Anyware
+        Manager yet, are waited for individually.
+
+        Args:
+            names (list of str): names of the instances to add
+            deployment (dict): Anyware Manager deployment to add the machines to
+            region (str): AWS region of the instances
+            max_workers (int): maximum number of concurrent requests
+
+        Returns:
+            tuple: a dictionary of machine names mapped to the machines added, and
+                a dictionary of machine names mapped to the errors raised
+        """
+        index = self.instance_index(deployment, region)
+
+        return bulk_run(
+            lambda name: self.machine_add_existing(name, deployment, region, index),
+            names,
+            max_workers,
+        )
+
+    def list_instances(self, deployment, region):
+        return self._get_data(
+            INSTANCES_PATH,
+            {
+                'deploymentId': deployment['deploymentId'],
+                'region':       region,
+            },
+        )
+
+    def instance_index(self, deployment, region):
+        """Returns the instance names mapped to the instance IDs of a region.
+
+        When several instances have the same name, the first one listed is used
+        as with instance_id_get().
+        """
+        index = {}
+        for instance in self.list_instances(deployment, region):
+            index.setdefault(instance['instanceName'], instance['instanceId'])
+
+        return index
+
+    def instance_id_get(self, deployment, region, instance_name):
+        params = {
+            'deploymentId': deployment['deploymentId'],
+            'region':       region,
+        }
+        resp = self._get_response(INSTANCES_PATH, params)
+        instances = resp.get('data', [])
+        instance_ids = [i['instanceId'] for i in instances if i['instanceName'] == instance_name]
+
+        # A cached listing might be older than the instance, so discard it for
+        # the next attempt of machine_add_existing to list the instances again
+        if not instance_ids:
+            self._cache_discard(INSTANCES_PATH, params, resp)
+
+        return instance_ids
@@ -0,0 +1,123 @@
+# © Copyright 2026 HP Development Company, L.P.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import collections
+import threading
+import time
+
+# Maximum number of responses kept in the cache
+DEFAULT_CACHE_SIZE = 256
+
+# Returned by _lookup() when a key is not in the cache, since None is a valid value
+_MISSING = object()
+
+
+class ResponseCache:
+    """In-memory LRU cache of Anyware Manager responses with a time to live.
+
+    Keys are made of the API path and the query parameters, so that a write to
+    a path can invalidate every cached response of that path. When several
+    threads look up the same missing key at the same time, only one of them
+    fetches it and the others wait for its result.
+    """
+
+    def __init__(self, ttl, max_size=DEFAULT_CACHE_SIZE):
+        self.ttl      = ttl
+        self.max_size = max_size
+        self.hits     = 0
+        self.misses   = 0
+
+        self._entries     = collections.OrderedDict()
+        self._fetch_locks = {}
+        self._lock        = threading.Lock()
+
+    @staticmethod
+    def key(path, params):
+        return (path, tuple(sorted((params or {}).items())))
+
+    def get_or_fetch(self, key, fetch, store_if=lambda value: True):
+        """Returns the cached value of key, or calls fetch to get it.
+
+        Args:
+            key (tuple): key returned by key()
+            fetch (function): function called without arguments on a miss
+            store_if (function): only values for which this returns True are cached
+
+        Returns:
+            the cached or fetched value
+        """
+        value = self._lookup(key)
+        if value is not _MISSING:
+            return value
+
+        with self._lock:
+            fetch_lock = self._fetch_locks.setdefault(key, threading.Lock())
+
+        with fetch_lock:
+            # Another thread might have fetched the value while this one waited
+            value = self._lookup(key)
+            if value is not _MISSING:
+                return value
+
+            with self._lock:
+                self.misses += 1
+            try:
+                value = fetch()
+                if store_if(value):
+                    self._store(key, value)
+            finally:
+                # Threads already waiting keep their reference to the lock
+                with self._lock:
+                    self._fetch_locks.pop(key, None)
+
+            return value
+
+    def discard(self, key, value):
+        """Removes key from the cache if it still holds value.
+
+        This is used by callers that found a cached value to be stale, without
+        discarding a newer value already fetched by another thread.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] is value:
+                del self._entries[key]
+
+    def invalidate(self, path=None):
+        """Removes the cached responses of path, or all of them if path is None."""
+        with self._lock:
+            for key in [k for k in self._entries if path is None or k[0] == path]:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits':   self.hits,
+                'misses': self.misses,
+                'size':   len(self._entries),
+            }
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return _MISSING
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+            return value
+
+    def _store(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
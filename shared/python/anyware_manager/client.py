@@ -0,0 +1,385 @@
+# © Copyright 2026 HP Development Company, L.P.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import abc
+import concurrent.futures
+
+import awm_transport
+import requests
+
+from .cache import DEFAULT_CACHE_SIZE, ResponseCache
+from .auth import TokenManager
+from .utils import bulk_run, wait_until
+
+# Maximum number of requests the bulk methods send to Anyware Manager at the
+# same time, to avoid overloading the Anyware Manager API
+MAX_CONCURRENT_REQUESTS = 10
+
+# Number of items requested per page when listing from Anyware Manager
+DEFAULT_PAGE_SIZE = 100
+
+# Maximum number of seconds to wait for Active Directory users to be synced
+USER_SYNC_TIMEOUT = 1800
+
+
+# The payloads and the paging of the Anyware Manager API are built by the
+# functions below, which are shared by the synchronous clients and the
+# asynchronous client in anyware_manager.aio.
+
+def deployment_payload(name, reg_code):
+    return {
+        'deploymentName':   name,
+        'registrationCode': reg_code,
+    }
+
+
+def deployment_key_payload(deployment, name):
+    return {
+        'deploymentId': deployment['deploymentId'],
+        'keyName': name
+    }
+
+
+def connector_payload(name, deployment):
+    return {
+        'createdBy':     deployment['createdBy'],
+        'deploymentId':  deployment['deploymentId'],
+        'connectorName': name,
+    }
+
+
+def signin_payload(awm_deployment_key):
+    return {
+        'username': awm_deployment_key['username'],
+        'apiKey': awm_deployment_key['apiKey']
+    }
+
+
+def entitlement_payload(user, machine):
+    return {
+        'machineId': machine['machineId'],
+        'deploymentId': machine['deploymentId'],
+        'userGuid': user['userGuid'],
+    }
+
+
+def page_params(params, offset, page_size):
+    """Returns the query parameters of a page of a list endpoint."""
+    return { **params, 'offset': offset, 'limit': page_size }
+
+
+def page_next_offset(resp, offset):
+    """Returns the offset of the page after a response of a list endpoint.
+
+    Anyware Manager might return fewer items than the limit requested, so the
+    last page is found from the total of the response, or from an empty page
+    if there is no total.
+
+    Args:
+        resp (dict): the response of the page
+        offset (int): offset of the page
+
+    Returns:
+        int: the offset of the next page, or None if this page is the last one
+    """
+    page   = resp.get('data', [])
+    offset += len(page)
+    total  = resp.get('total')
+
+    if not page or (total is not None and offset >= total):
+        return None
+
+    return offset
+
+
+class AnywareManager(abc.ABC):
+    """Anyware Manager API client.
+
+    This is an abstract class: the methods that depend on the cloud provider
+    of the machines, such as machine_add_existing, are implemented by the
+    provider clients in anyware_manager.aws and anyware_manager.gcp.
+
+    Responses of the read-only lookups can be cached for cache_ttl seconds by
+    passing a cache_ttl. Writes through the same client invalidate the cached
+    responses they affect, and empty responses are never cached since callers
+    poll for users and machines to appear.
+
+    After deployment_signin, the token is refreshed with the deployment key
+    before it expires, and requests rejected with 401 are sent again once
+    after signing in again.
+    """
+
+    def __init__(self, auth_token, url='https://cas.teradici.com',
+                 verify_certificate=True, cache_ttl=None,
+                 cache_size=DEFAULT_CACHE_SIZE):
+        self.url = url
+        # Option to disable verification to avoid validation errors
+        # from self-signed certificates as may be used by Anyware Manager.
+        # The pool keeps one connection per worker thread used by the bulk methods.
+        self.session = awm_transport.session_create(
+            verify=verify_certificate,
+            pool_size=MAX_CONCURRENT_REQUESTS,
+        )
+        # The token manager sets the authorization header of every request, so
+        # that a refreshed token is used by all the threads sharing the session
+        self.token_manager = TokenManager(auth_token)
+        self.session.auth = self.token_manager
+        self.cache = ResponseCache(cache_ttl, cache_size) if cache_ttl else None
+
+    @property
+    def auth_token(self):
+        return self.token_manager.token
+
+    def cache_stats(self):
+        """Returns the number of cache hits, misses and cached responses."""
+        return self.cache.stats() if self.cache else None
+
+    def auth_token_validate(self):
+        resp = awm_transport.idempotent_post(
+            self.session,
+            self.url + '/api/v1/auth/verify')
+        try:
+            resp.raise_for_status()
+            return True
+        except requests.models.HTTPError:
+            if resp.status_code == 401:
+                return False
+            raise
+
+    def deployment_create(self, name, reg_code):
+        # this is the connector token endpoint
+        resp = self.session.post(
+            self.url + '/api/v1/deployments',
+            json = deployment_payload(name, reg_code),
+        )
+        resp.raise_for_status()
+
+        return resp.json()['data']
+
+    def deployment_key_create(self, deployment, name='sa-key-1'):
+        # this is the deployment service account endpoint
+        resp = self.session.post(
+            self.url + '/api/v1/auth/keys',
+            json = deployment_key_payload(deployment, name)
+        )
+        resp.raise_for_status()
+
+        return resp.json()['data']
+
+    def connector_create(self, name, deployment):
+        resp = self.session.post(
+            self.url + '/api/v1/auth/tokens/connector',
+            json = connector_payload(name, deployment),
+        )
+        resp.raise_for_status()
+
+        return resp.json()['data']
+
+    def connectors_get(self, deployment):
+        return list(self.iter_connectors(deployment))
+
+    def iter_connectors(self, deployment, page_size=DEFAULT_PAGE_SIZE):
+        return self._iter_pages(
+            '/api/v1/deployments/connectors',
+            { 'deploymentId': deployment['deploymentId'] },
+            page_size,
+        )
+
+    def deployment_signin(self, awm_deployment_key):
+        """Signs in with a deployment key and keeps the token refreshed with it."""
+        account_details = signin_payload(awm_deployment_key)
+
+        def signin():
+            # Without the token manager, so that a rejected sign in isn't
+            # answered by signing in again
+            resp = awm_transport.idempotent_post(
+                self.session,
+                self.url + '/api/v1/auth/signin',
+                json = account_details,
+                auth = lambda request: request,
+            )
+            resp.raise_for_status()
+
+            return resp.json()['data']['token']
+
+        self.token_manager.signin = signin
+        self.token_manager.refresh()
+
+    @abc.abstractmethod
+    def machine_add_existing(self, name, *args):
+        """Adds an existing machine of the cloud provider to Anyware Manager."""
+
+    def machines_add_existing_bulk(self, names, *args, max_workers=MAX_CONCURRENT_REQUESTS):
+        """Adds existing machines to Anyware Manager concurrently.
+
+        Args:
+            names (list of str): names of the machines to add
+            args: the other arguments of machine_add_existing, which depend on
+                the cloud provider
+            max_workers (int): maximum number of concurrent requests
+
+        Returns:
+            tuple: a dictionary of machine names mapped to the machines added, and
+                a dictionary of machine names mapped to the errors raised
+        """
+        return bulk_run(
+            lambda name: self.machine_add_existing(name, *args),
+            names,
+            max_workers,
+        )
+
+    def entitlement_add(self, user, machine):
+        resp = self.session.post(
+            self.url + '/api/v1/machines/entitlements',
+            json = entitlement_payload(user, machine),
+        )
+        resp.raise_for_status()
+        self._cache_invalidate('/api/v1/machines/entitlements')
+
+        return resp.json()['data']
+
+    def entitlements_get(self, deployment, user):
+        entitlements = self._iter_pages(
+            '/api/v1/machines/entitlements',
+            {
+                'deploymentId': deployment['deploymentId'],
+                'userGuid': user['userGuid'],
+            },
+            DEFAULT_PAGE_SIZE,
+        )
+
+        return [e for e in entitlements if e['userGuid'] == user['userGuid']]
+
+    def entitlements_add_bulk(self, user, machines, max_workers=MAX_CONCURRENT_REQUESTS):
+        """Entitles a user to machines concurrently.
+
+        The existing entitlements of the user are fetched once per deployment,
+        and machines the user is already entitled to are skipped.
+
+        Args:
+            user (dict): Anyware Manager user to entitle
+            machines (list of dict): Anyware Manager machines to entitle the user to
+            max_workers (int): maximum number of concurrent requests
+
+        Returns:
+            tuple: a dictionary of machine IDs mapped to the entitlements added,
+                a list of machine IDs skipped, and a dictionary of machine IDs
+                mapped to the errors raised. Machine names are not unique, so
+                the results are keyed by machine ID.
+        """
+        entitled = set()
+        for deployment_id in { m['deploymentId'] for m in machines }:
+            entitlements = self.entitlements_get({'deploymentId': deployment_id}, user)
+            entitled.update(e['machineId'] for e in entitlements)
+
+        pending = { m['machineId']: m for m in machines if m['machineId'] not in entitled }
+        skipped = [ m['machineId'] for m in machines if m['machineId'] in entitled ]
+
+        added, failed = bulk_run(
+            lambda machine_id: self.entitlement_add(user, pending[machine_id]),
+            pending,
+            max_workers,
+        )
+
+        return added, skipped, failed
+
+    def user_get(self, name, deployment):
+        users = self._get_data(
+            '/api/v1/machines/entitlements/adusers',
+            {
+                'deploymentId': deployment['deploymentId'],
+                'name': name,
+            },
+        )
+
+        return users[0] if len(users) >= 1 else None
+
+    def wait_for_user(self, name, deployment, timeout=USER_SYNC_TIMEOUT):
+        """Waits until an Active Directory user is synced to Anyware Manager.
+
+        Args:
+            name (str): name of the user to wait for
+            deployment (dict): Anyware Manager deployment the user is synced to
+            timeout (int): maximum number of seconds to wait
+
+        Returns:
+            tuple: the user, the number of lookups made and the elapsed seconds
+
+        Raises:
+            TimeoutError: if the user is not synced within timeout seconds
+        """
+        return wait_until(lambda: self.user_get(name, deployment), timeout)
+
+    def machines_get(self, deployment):
+        return list(self.iter_machines(deployment))
+
+    def iter_machines(self, deployment, name_prefix='', page_size=DEFAULT_PAGE_SIZE):
+        """Iterates over the machines in a deployment one page at a time.
+
+        Args:
+            deployment (dict): Anyware Manager deployment to list the machines of
+            name_prefix (str): only yield machines whose name starts with this prefix
+            page_size (int): number of machines requested per page
+
+        Yields:
+            dict: an Anyware Manager machine
+        """
+        machines = self._iter_pages(
+            '/api/v1/machines',
+            { 'deploymentId': deployment['deploymentId'] },
+            page_size,
+        )
+
+        return (m for m in machines if m['machineName'].startswith(name_prefix))
+
+    def _iter_pages(self, path, params, page_size):
+        """Iterates over the items of a paginated Anyware Manager list endpoint.
+
+        The next page is requested in the background while the caller handles
+        the items of the current page, so only about two pages are held in
+        memory at a time.
+        """
+        def page_get(offset):
+            return self._get_response(path, page_params(params, offset, page_size))
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            offset = 0
+            next_page = executor.submit(page_get, offset)
+            while next_page:
+                resp = next_page.result()
+                offset = page_next_offset(resp, offset)
+                next_page = executor.submit(page_get, offset) if offset is not None else None
+
+                yield from resp.get('data', [])
+
+    def _get_data(self, path, params):
+        """Gets the data of a read-only Anyware Manager endpoint, from the cache if enabled."""
+        return self._get_response(path, params).get('data', [])
+
+    def _get_response(self, path, params):
+        """Gets the response of a read-only Anyware Manager endpoint, from the cache if enabled."""
+        def response_get():
+            resp = self.session.get(self.url + path, params = params)
+            resp.raise_for_status()
+
+            return resp.json()
+
+        if not self.cache:
+            return response_get()
+
+        return self.cache.get_or_fetch(
+            ResponseCache.key(path, params),
+            response_get,
+            store_if = lambda resp: bool(resp.get('data')),
+        )
+
+    def _cache_discard(self, path, params, resp):
+        """Discards a response returned by _get_response() that was found to be stale."""
+        if self.cache:
+            self.cache.discard(ResponseCache.key(path, params), resp)
+
+    def _cache_invalidate(self, path):
+        if self.cache:
+            self.cache.invalidate(path)
@@ -0,0 +1,51 @@
+# © Copyright 2026 HP Development Company, L.P.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from .client import AnywareManager
+
+
+class GcpAnywareManager(AnywareManager):
+    """Anyware Manager API client for deployments of GCP machines."""
+
+    def deployment_add_gcp_account(self, key, deployment):
+        credentials = {
+            'clientEmail': key['client_email'],
+            'privateKey':  ''.join(key['private_key'].split('\n')[1:-2]),
+            'projectId':   key['project_id'],
+        }
+
+        account_details = {
+            'deploymentId': deployment['deploymentId'],
+            'provider':     'gcp',
+            'credential':   credentials,
+        }
+
+        resp = self.session.post(
+            self.url + '/api/v1/auth/users/cloudServiceAccount',
+            json = account_details,
+        )
+        resp.raise_for_status()
+
+    @staticmethod
+    def machine_payload(name, project_id, zone, deployment):
+        return {
+            'provider':    'gcp',
+            'machineName':  name,
+            'deploymentId': deployment['deploymentId'],
+            'projectId':    project_id,
+            'zone':         zone,
+            'active':       True,
+            'managed':      True,
+        }
+
+    def machine_add_existing(self, name, project_id, zone, deployment):
+        resp = self.session.post(
+            self.url + '/api/v1/machines',
+            json = self.machine_payload(name, project_id, zone, deployment),
+        )
+        resp.raise_for_status()
+        self._cache_invalidate('/api/v1/machines')
+
+        return resp.json()['data']
@@ -0,0 +1,71 @@
+# © Copyright 2026 HP Development Company, L.P.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import concurrent.futures
+import random
+import time
+
+
+def wait_until(predicate, timeout, initial_delay=1, max_delay=30):
+    """Calls predicate with exponential backoff until it returns a truthy value.
+
+    The delay between calls starts at initial_delay seconds and doubles after
+    every call up to max_delay seconds, with random jitter so that concurrent
+    waiters don't poll in lockstep.
+
+    Args:
+        predicate (function): function called without arguments
+        timeout (int): maximum number of seconds to wait
+        initial_delay (float): number of seconds to wait after the first call
+        max_delay (float): maximum number of seconds to wait between calls
+
+    Returns:
+        tuple: the value returned by predicate, the number of calls made and
+            the elapsed seconds
+
+    Raises:
+        TimeoutError: if predicate doesn't return a truthy value within timeout seconds
+    """
+    start    = time.monotonic()
+    delay    = initial_delay
+    attempts = 0
+
+    while True:
+        attempts += 1
+        result  = predicate()
+        elapsed = time.monotonic() - start
+        if result:
+            return result, attempts, elapsed
+
+        if elapsed >= timeout:
+            raise TimeoutError(f'Timed out after {attempts} attempts in {elapsed:.0f} seconds.')
+
+        # Sleep between half and all of the current delay, without going past the timeout
+        time.sleep(min(random.uniform(delay / 2, delay), timeout - elapsed))
+        delay = min(delay * 2, max_delay)
+
+
+def bulk_run(function, items, max_workers):
+    """Calls function for each item over a bounded pool of worker threads.
+
+    Returns:
+        tuple: a dictionary of items mapped to the results, and a dictionary
+            of items mapped to the errors raised
+    """
+    results = {}
+    errors  = {}
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = { executor.submit(function, item): item for item in items }
+        for future in concurrent.futures.as_completed(futures):
+            item = futures[future]
+            try:
+                results[item] = future.result()
+            # Record the error and carry on so that one failed item doesn't
+            # stop the rest from being processed
+            except Exception as e:
+                errors[item] = e
+
+    return results, errors
@@ -0,0 +1,231 @@
+# © Copyright 2026 HP Development Company, L.P.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""Anyware Manager tokens shared by the scripts and the API clients.
+
+Tokens can be cached on disk with token_cache_read() and token_cache_write(),
+so that scripts run again on the same machine reuse them while they are valid.
+connector_token_get() creates connector tokens reusing such a cache.
+token_write() and token_fd_write() hand tokens over to other programs.
+"""
+
+import base64
+import binascii
+import json
+import os
+import tempfile
+import time
+
+import requests
+
+# Tokens expiring within this number of seconds are not reused from the cache,
+# and are refreshed by anyware_manager.auth.TokenManager
+TOKEN_EXPIRY_MARGIN = 300
+
+
+def token_expiry_get(token):
+    """A function to get the expiry time of a JWT token
+
+    The signature is not verified since the token is only read to know when it
+    stops being valid, Anyware Manager still validates it on every request.
+
+    Args:
+        token (str): the token
+    Returns:
+        float: the expiry time in seconds since the epoch, or None if the token
+            is not a JWT token with an expiry time
+    """
+
+    try:
+        payload = token.split('.')[1]
+        # JWT tokens are base64url encoded without padding
+        claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+        return float(claims['exp'])
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError, binascii.Error):
+        return None
+
+
+def cached_token_get(cache, key, max_age=None):
+    """A function to get a token from a token cache if it can be reused
+
+    A token is reused if it was cached less than max_age seconds ago, and it
+    doesn't expire within TOKEN_EXPIRY_MARGIN seconds. Tokens without an
+    expiry time are only reused with a max_age.
+
+    Args:
+        cache (dict): the cached values, as returned by token_cache_read()
+        key (str): key of the token in the cache
+        max_age (float): maximum number of seconds since the token was cached
+    Returns:
+        string: the token, or None if it can't be reused
+    """
+
+    token = cache.get(key)
+    if not token:
+        return None
+
+    if max_age is not None and time.time() - cache.get(f'{key}_cached_at', 0) > max_age:
+        return None
+
+    expiry = token_expiry_get(token)
+    if expiry is None:
+        return token if max_age is not None else None
+
+    return token if expiry - TOKEN_EXPIRY_MARGIN > time.time() else None
+
+
+def cached_token_set(cache, key, token):
+    """A function to add a token to a token cache, with the time it was cached"""
+
+    cache[key] = token
+    cache[f'{key}_cached_at'] = time.time()
+
+
+def token_cache_read(path):
+    """A function to read a token cache file
+
+    Args:
+        path (str): path of the cache file
+    Returns:
+        dict: the cached values, empty if the file doesn't exist or can't be read
+    """
+
+    try:
+        with open(path) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    return cache if isinstance(cache, dict) else {}
+
+
+def token_cache_write(path, cache):
+    """A function to write a token cache file
+
+    The file is only readable by the user, and is replaced atomically so that
+    a script interrupted while writing doesn't leave a partial file.
+
+    Args:
+        path (str): path of the cache file
+        cache (dict): the values to cache
+    """
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), mode=0o700, exist_ok=True)
+
+    _file_replace(path, lambda f: json.dump(cache, f))
+
+
+def connector_token_get(session, deployment_id, signin, token_create,
+                        connector_name_create, cache_path=None, max_age=None):
+    """A function to get a connector token, reusing a token cache file if given
+
+    A cached connector token is reused while it is valid, otherwise a new one
+    is created with the cached Anyware Manager session. If the cached session
+    is rejected with 401, the session is signed in again once. The connector
+    keeps its cached name when it gets a new token, so that it doesn't appear
+    as a new connector in Anyware Manager.
+
+    Args:
+        session (requests.Session): the session used for calls to Anyware Manager
+        deployment_id (str): ID of the deployment of the connector
+        signin (callable): signs in to Anyware Manager with the session and
+            returns the session token
+        token_create (callable): creates a connector token with the session,
+            called with the connector name
+        connector_name_create (callable): returns the name of a new connector
+        cache_path (str): path of the token cache file, or None to not cache
+        max_age (float): maximum number of seconds since a cached connector
+            token was created to reuse it
+    Returns:
+        string: the connector token
+    """
+
+    # A cache is only used for the deployment it was created for
+    cache = token_cache_read(cache_path) if cache_path else {}
+    if cache.get('deployment_id') != deployment_id:
+        cache = {'deployment_id': deployment_id}
+
+    connector_token = cached_token_get(cache, 'connector_token', max_age)
+    if connector_token:
+        print(f"Reusing the cached connector token of {cache['connector_name']}...")
+        return connector_token
+
+    connector_name = cache.get('connector_name') or connector_name_create()
+
+    session_token = cached_token_get(cache, 'session_token')
+    if session_token:
+        print("Reusing the cached Anyware Manager session...")
+        session.headers.update({"Authorization": session_token})
+        try:
+            connector_token = token_create(connector_name)
+        except requests.HTTPError as e:
+            if e.response is None or e.response.status_code != 401:
+                raise
+            # The cached session is no longer valid, so sign in again
+            session_token = None
+
+    if not session_token:
+        session_token = signin()
+        connector_token = token_create(connector_name)
+
+    if cache_path:
+        cache['connector_name'] = connector_name
+        cached_token_set(cache, 'session_token', session_token)
+        cached_token_set(cache, 'connector_token', connector_token)
+        token_cache_write(cache_path, cache)
+
+    return connector_token
+
+
+def token_write(token, path):
+    """A function to write a token to a file
+
+    The token is written to a temporary file only readable by the user, which
+    is renamed so that the file never has a partial token.
+
+    Args:
+        token (str): the token
+        path (str): path of the file
+    """
+
+    _file_replace(path, lambda f: f.write(token))
+
+
+def token_fd_write(token, fd):
+    """A function to write a token to a file descriptor, such as stdout or a pipe
+
+    The file descriptor is left open.
+
+    Args:
+        token (str): the token
+        fd (int): the file descriptor
+    """
+
+    data = token.encode('utf-8')
+    while data:
+        data = data[os.write(fd, data):]
+
+
+def _file_replace(path, write):
+    """A function to replace a file atomically with a file only readable by the user
+
+    The content is written to a temporary file with a unique name in the same
+    directory, so that scripts writing the same file at the same time don't
+    write to the same temporary file, which is then renamed.
+
+    Args:
+        path (str): path of the file
+        write (callable): writes the content, called with the temporary file
+    """
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                    prefix=f'.{os.path.basename(path)}.')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
@@ -0,0 +1,208 @@
+# © Copyright 2026 HP Development Company, L.P.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""HTTP transport shared by the Anyware Manager API clients.
+
+All clients should create their requests.Session with session_create() so that
+they get the same connection pooling, retry and timeout behavior.
+"""
+
+import email.utils
+import time
+
+import requests
+
+# Timeouts in seconds for connecting to and reading from Anyware Manager,
+# used for requests that don't specify their own timeout
+DEFAULT_TIMEOUT = (10, 60)
+
+# Number of connections kept alive in the pool, which should match the
+# number of threads sending requests with the session at the same time
+DEFAULT_POOL_SIZE = 10
+
+DEFAULT_RETRIES        = 10
+DEFAULT_BACKOFF_FACTOR = 1
+
+# 429 and 503 responses are retried after the delay in their Retry-After
+# header when there is one, otherwise after the backoff delay
+RETRY_STATUS_CODES       = [429, 500, 502, 503, 504]
+RETRY_AFTER_STATUS_CODES = [429, 503]
+
+# Only idempotent methods are retried, using the default of urllib3, since
+# retrying a POST that Anyware Manager already handled would create its
+# resource again. POST requests known to be safe to send again are retried
+# with idempotent_post().
+RETRY_METHODS = getattr(requests.adapters.Retry, 'DEFAULT_ALLOWED_METHODS', None)
+if RETRY_METHODS is None:
+    # Versions of urllib3 older than 1.26.0 name it DEFAULT_METHOD_WHITELIST
+    RETRY_METHODS = requests.adapters.Retry.DEFAULT_METHOD_WHITELIST
+
+# Maximum number of seconds of the backoff delay between retries
+RETRY_BACKOFF_MAX = 120
+
+
+class TimeoutHTTPAdapter(requests.adapters.HTTPAdapter):
+    """An HTTPAdapter that applies a default timeout to every request."""
+
+    def __init__(self, *args, timeout=DEFAULT_TIMEOUT, **kwargs):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+
+        return super().send(request, **kwargs)
+
+
+class AnywareManagerRetry(requests.adapters.Retry):
+    """A Retry that only waits for the Retry-After header of RETRY_AFTER_STATUS_CODES."""
+
+    RETRY_AFTER_STATUS_CODES = frozenset(RETRY_AFTER_STATUS_CODES)
+
+
+def retry_create(retries=DEFAULT_RETRIES, backoff_factor=DEFAULT_BACKOFF_FACTOR):
+    """A function to create the retry strategy for requests to Anyware Manager
+
+    Once the retries are used up, the last response is returned instead of
+    raising an error, so callers still get an HTTPError from raise_for_status().
+
+    Args:
+        retries (int): maximum number of retries
+        backoff_factor (float): factor of the exponential delay between retries
+    Returns:
+        Retry: the retry strategy
+    """
+
+    retry_args = {
+        'total':                      retries,
+        'backoff_factor':             backoff_factor,
+        'status_forcelist':           RETRY_STATUS_CODES,
+        'respect_retry_after_header': True,
+        'raise_on_status':            False,
+    }
+
+    try:
+        return AnywareManagerRetry(allowed_methods=RETRY_METHODS, **retry_args)
+    except TypeError:
+        # Versions of urllib3 older than 1.26.0 use method_whitelist instead of allowed_methods
+        return AnywareManagerRetry(method_whitelist=RETRY_METHODS, **retry_args)
+
+
+def retry_delay_get(retry, retry_after=None, backoff_factor=DEFAULT_BACKOFF_FACTOR):
+    """A function to get the number of seconds to wait before a retry
+
+    This is the delay used by the retry strategy of retry_create(), for
+    clients that don't send their requests with a requests.Session.
+
+    Args:
+        retry (int): number of the retry, starting at 1
+        retry_after (str): Retry-After header of the response, if any
+        backoff_factor (float): factor of the exponential delay between retries
+    Returns:
+        float: the number of seconds to wait
+    """
+
+    if retry_after:
+        try:
+            return max(float(retry_after), 0)
+        except ValueError:
+            pass
+
+        # Retry-After can also be an HTTP date
+        try:
+            return max(email.utils.parsedate_to_datetime(retry_after).timestamp() - time.time(), 0)
+        except (TypeError, ValueError):
+            pass
+
+    return min(backoff_factor * 2 ** (retry - 1), RETRY_BACKOFF_MAX)
+
+
+def retry_allowed(method, idempotent=False):
+    """A function to check whether a request may be retried
+
+    Args:
+        method (str): HTTP method of the request
+        idempotent (bool): whether the request is known to be safe to send
+            again, even if its method is not idempotent
+    Returns:
+        bool: True if the request may be retried
+    """
+
+    return idempotent or method.upper() in RETRY_METHODS
+
+
+def idempotent_post(session, url, **kwargs):
+    """A function to send a POST request that is safe to send again, retrying it
+
+    Sessions from session_create() don't retry POST requests, since most of
+    them create a resource in Anyware Manager. This retries a POST request
+    that doesn't, such as signing in, with the retry strategy of the session.
+
+    Args:
+        session (requests.Session): the session from session_create()
+        url (str): URL of the request
+        kwargs: the other arguments of session.post()
+    Returns:
+        requests.Response: the last response
+    """
+
+    retry_strategy = session.get_adapter(url).max_retries
+    retry = 0
+
+    while True:
+        retry += 1
+        try:
+            resp = session.post(url, **kwargs)
+        except requests.exceptions.ConnectionError:
+            if retry > retry_strategy.total:
+                raise
+            time.sleep(retry_delay_get(retry, None, retry_strategy.backoff_factor))
+            continue
+
+        if resp.status_code not in RETRY_STATUS_CODES or retry > retry_strategy.total:
+            return resp
+
+        retry_after = None
+        if resp.status_code in RETRY_AFTER_STATUS_CODES:
+            retry_after = resp.headers.get('Retry-After')
+        resp.close()
+
+        time.sleep(retry_delay_get(retry, retry_after, retry_strategy.backoff_factor))
+
+
+def session_create(verify=True, pool_size=DEFAULT_POOL_SIZE, retries=DEFAULT_RETRIES,
+                   backoff_factor=DEFAULT_BACKOFF_FACTOR, timeout=DEFAULT_TIMEOUT):
+    """A function to create a session to be used for calls to Anyware Manager
+
+    Connections are kept alive and reused from a pool, failed requests with an
+    idempotent method are retried with exponential backoff, and every request
+    has a timeout.
+
+    Args:
+        verify (bool): whether to verify the certificate of Anyware Manager
+        pool_size (int): number of connections kept alive in the pool
+        retries (int): maximum number of retries
+        backoff_factor (float): factor of the exponential delay between retries
+        timeout (float or tuple): default connect and read timeouts in seconds
+    Returns:
+        requests.Session: the session
+    """
+
+    session = requests.Session()
+    # Option to disable verification to avoid validation errors
+    # from self-signed certificates as may be used by Anyware Manager
+    session.verify = verify
+
+    adapter = TimeoutHTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=retry_create(retries, backoff_factor),
+        timeout=timeout,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    return session
@@ -0,0 +1,181 @@
+# © Copyright 2026 HP Development Company, L.P.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""Configuration files for running the quickstart scripts without prompts.
+
+A configuration file has the same settings the quickstart scripts prompt for,
+in YAML (.yaml, .yml), JSON (.json) or "key: value" lines (any other extension).
+Secrets can be read from an environment variable or a file instead of being
+written in the configuration file, by adding the suffix _env or _file to their
+key. For example:
+
+    reg_code_env:     PCOIP_REGISTRATION_CODE
+    api_token_file:   /run/secrets/awm_api_token
+    ad_password_env:  AD_ADMIN_PASSWORD
+"""
+
+import concurrent.futures
+import json
+import os
+import re
+
+SECRET_KEYS = ['reg_code', 'api_token', 'ad_password']
+
+# Format of PCoIP Registration Codes (Ex. ABCDEFGHIJKL@0123-4567-89AB-CDEF)
+REG_CODE_REGEX = r'^[0-9A-Z]{12}@([0-9A-F]{4}-){3}[0-9A-F]{4}$'
+
+# Maximum number of validations run at the same time
+MAX_VALIDATION_WORKERS = 8
+
+
+def config_file_read(path):
+    """Reads a quickstart configuration file and resolves its secrets.
+
+    Args:
+        path (str): path of the configuration file
+
+    Returns:
+        dict: the settings of the configuration file
+
+    Raises:
+        ValueError: if the file is not a mapping of settings, or a secret
+            can't be read
+    """
+    with open(path, 'r') as f:
+        if path.endswith('.json'):
+            cfg_data = json.load(f)
+        elif path.endswith(('.yaml', '.yml')):
+            # Only imported for YAML files so that PyYAML stays optional
+            import yaml
+            cfg_data = yaml.safe_load(f)
+        else:
+            cfg_data = {}
+            for line in f:
+                if line[0] in ('#', '\n'):
+                    continue
+
+                key, value = map(str.strip, line.split(':', 1))
+                cfg_data[key] = value
+
+    if not isinstance(cfg_data, dict):
+        raise ValueError(f'{path} must contain a mapping of settings.')
+
+    for key in SECRET_KEYS:
+        env_key  = f'{key}_env'
+        file_key = f'{key}_file'
+        if env_key in cfg_data:
+            name = cfg_data.pop(env_key)
+            if name not in os.environ:
+                raise ValueError(f'Environment variable {name} for {key} is not set.')
+            cfg_data[key] = os.environ[name]
+        elif file_key in cfg_data:
+            with open(os.path.expanduser(cfg_data.pop(file_key)), 'r') as secret_file:
+                cfg_data[key] = secret_file.read().strip()
+
+    return cfg_data
+
+
+def count_get(cfg_data, key):
+    """Returns a setting that must be a number of resources, 0 if it is missing.
+
+    Raises:
+        ValueError: if the setting is not a non-negative integer
+    """
+    try:
+        count = int(cfg_data.get(key) or 0)
+    except (TypeError, ValueError):
+        count = -1
+
+    if count < 0:
+        raise ValueError(f'{key} must be a non-negative integer.')
+
+    return count
+
+
+def ad_password_error_get(password, username):
+    """Returns why the Active Directory password doesn't meet the requirements, or None if it does.
+
+    See: https://docs.microsoft.com/en-us/windows/security/threat-protection/security-policy-settings/password-must-meet-complexity-requirements
+    """
+    # delimeters are specified in the microsoft documentation
+    username_parsed = re.split(r'[—,.\-\_#\s\t]', username)
+    for u in username_parsed:
+        if len(u) < 3:
+            continue
+        if re.search(u, password, re.IGNORECASE):
+            return 'Password cannot contain username.'
+
+    if len(password) < 7:
+        return 'Password must be at least 7 characters long.'
+
+    count = 0
+
+    # check lowercase, uppercase, digits, special characters
+    checks = [r'[a-z]', r'[A-Z]', r'\d', r'[@$!%*#?&]']
+    for regex in checks:
+        if re.search(regex, password):
+            count += 1
+
+    # check unicode: if the password contains unicode characters,
+    # it will change when encoded to utf-8 to one of [\u00d8-\u00f6]
+    if f'b\'{password}\'' != f'{password.encode("utf-8")}':
+        count += 1
+
+    if (count > 2):
+        return None
+    return 'Password does not meet the complexity requirements.'
+
+
+def answer_is_yes(prompt, assume_yes=False):
+    """Asks a yes or no question until it is answered, and returns True if it was answered yes.
+
+    Running from a configuration file must not stop for any input, so with
+    assume_yes the question is answered yes without waiting for input.
+    """
+    if assume_yes:
+        print(f'{prompt}y')
+        return True
+
+    while True:
+        response = input(prompt).strip().lower()
+        if response in ('y', 'yes'):
+            return True
+        if response in ('n', 'no'):
+            return False
+
+
+def validations_run(validations, max_workers=MAX_VALIDATION_WORKERS):
+    """Runs validations concurrently.
+
+    Args:
+        validations (dict): descriptions mapped to functions called without
+            arguments, that return an error message or None if valid
+        max_workers (int): maximum number of validations run at the same time
+
+    Returns:
+        dict: descriptions of the failed validations mapped to their error messages
+    """
+    errors = {}
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = { executor.submit(v): description for description, v in validations.items() }
+        for future in concurrent.futures.as_completed(futures):
+            description = futures[future]
+            try:
+                error = future.result()
+            # An error calling a cloud API fails the validation instead of the others
+            except Exception as e:
+                error = f'{type(e).__name__}: {e}'
+            if error:
+                errors[description] = error
+
+    # In the order the validations were given
+    return { d: errors[d] for d in validations if d in errors }
+
+
+def validation_errors_print(errors):
+    print('The configuration file is not valid:')
+    for description, error in errors.items():
+        print(f'  {description}: {error}')
@@ -0,0 +1,277 @@
+# © Copyright 2026 HP Development Company, L.P.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""Concurrent execution of the setup steps of the quickstart scripts.
+
+Steps are given as a dictionary of step names mapped to a function and the
+names of the steps it requires. A step starts as soon as all the steps it
+requires have finished, and its function is called with their results:
+
+    results = quickstart_steps.steps_run({
+        'deployment':     (deployment_create, []),
+        'deployment_key': (deployment_key_create, ['deployment']),
+        'ssh_key':        (ssh_key_create, []),
+    })
+
+With a StepJournal, the results of the finished steps are saved to a file, so
+that running the script again after a failure resumes from the steps that
+didn't finish instead of creating everything again. Steps that return secrets,
+such as keys, only have their completion saved, and their results are loaded
+again from where the step wrote them:
+
+    results = quickstart_steps.steps_run(steps, journal=journal, secret_steps={
+        'deployment_key': lambda: key_read(AWM_DEPLOYMENT_SA_KEY_PATH),
+    })
+
+pipeline_run() processes items while they are being produced, for example to
+add workstations to Anyware Manager while Terraform creates the others.
+"""
+
+import concurrent.futures
+import json
+import os
+import threading
+import time
+
+# Maximum number of steps run at the same time
+DEFAULT_MAX_WORKERS = 8
+
+
+class StepError(Exception):
+    """Raised when a step fails, with the name of the step and its error."""
+
+    def __init__(self, name, error):
+        super().__init__(f'Step {name} failed: {error}')
+        self.name  = name
+        self.error = error
+
+
+class StepJournal:
+    """Journal of the finished steps of a quickstart run, saved to a JSON file.
+
+    The results of the steps must be JSON serializable, and must not be secrets
+    since the file is not encrypted. The file is rewritten atomically after
+    each change and is only readable by the user.
+    """
+
+    def __init__(self, path):
+        self.path  = path
+        self._lock = threading.Lock()
+        self._data = {'values': {}, 'steps': {}}
+
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                self._data = json.load(f)
+
+    def steps_done(self):
+        """Returns the names of the steps recorded in the journal."""
+        with self._lock:
+            return list(self._data['steps'])
+
+    def step_done(self, name):
+        with self._lock:
+            return name in self._data['steps']
+
+    def step_result(self, name):
+        with self._lock:
+            return self._data['steps'][name]
+
+    def step_record(self, name, result):
+        with self._lock:
+            self._data['steps'][name] = result
+            self._save()
+
+    def step_run(self, name, function):
+        """Returns the recorded result of a step, or runs and records it.
+
+        Args:
+            name (str): name of the step
+            function (function): function of the step, called without arguments
+
+        Returns:
+            the result of the step
+        """
+        if self.step_done(name):
+            print(f'Skipping {name}, finished in a previous run.')
+            return self.step_result(name)
+
+        result = function()
+        self.step_record(name, result)
+
+        return result
+
+    def value_get(self, key, default=None):
+        with self._lock:
+            return self._data['values'].get(key, default)
+
+    def value_set(self, key, value):
+        with self._lock:
+            self._data['values'][key] = value
+            self._save()
+
+    def value_append(self, key, value):
+        """Appends value to the list saved as key, which can be done from several threads."""
+        with self._lock:
+            self._data['values'].setdefault(key, []).append(value)
+            self._save()
+
+    def remove(self):
+        """Removes the journal file, for example once the run is complete."""
+        with self._lock:
+            self._data = {'values': {}, 'steps': {}}
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def _save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), mode=0o700, exist_ok=True)
+
+        tmp_path = f'{self.path}.tmp'
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self._data, f, indent=2)
+        # A run interrupted while saving leaves the previous journal intact
+        os.replace(tmp_path, self.path)
+
+
+def steps_run(steps, max_workers=DEFAULT_MAX_WORKERS, journal=None, always_run=(),
+              secret_steps=None):
+    """Runs steps concurrently in the order of their requirements.
+
+    When a step fails, no other step is started, the running steps are waited
+    for and StepError is raised.
+
+    Args:
+        steps (dict): step names mapped to a tuple of the function of the step
+            and the list of the names of the steps it requires
+        max_workers (int): maximum number of steps run at the same time
+        journal (StepJournal): journal the results of the finished steps are
+            recorded in, and steps already recorded in it are skipped
+        always_run (list): names of the steps that are run and not recorded
+            even with a journal, such as steps that only change the state of
+            the script
+        secret_steps (dict): names of the steps whose results are secrets
+            mapped to functions called without arguments that load the results
+            again, for example from the files the steps wrote them to. Only the
+            completion of these steps is recorded in the journal.
+
+    Returns:
+        dict: step names mapped to the values returned by their functions
+
+    Raises:
+        ValueError: if a step requires an unknown step, or steps require each
+            other, in which case no step is run
+        StepError: if a step raised an error
+    """
+    for name, (_, requires) in steps.items():
+        unknown = [r for r in requires if r not in steps]
+        if unknown:
+            raise ValueError(f'Step {name} requires unknown steps: {", ".join(unknown)}')
+
+    # Check that all the steps can run before running any of them
+    ordered = set()
+    while len(ordered) < len(steps):
+        ready = {name for name, (_, requires) in steps.items() if name not in ordered and ordered.issuperset(requires)}
+        if not ready:
+            raise ValueError(f'Steps require each other: {", ".join(n for n in steps if n not in ordered)}')
+        ordered |= ready
+
+    def step_run(name):
+        function, requires = steps[name]
+        start  = time.monotonic()
+        result = function(*[results[r] for r in requires])
+        if journal and name not in always_run:
+            # The journal is a plain file, so it only records that a secret
+            # step finished and not its result
+            journal.step_record(name, None if name in secret_steps else result)
+
+        return result, time.monotonic() - start
+
+    secret_steps = secret_steps or {}
+
+    results  = {}
+    timings  = {}
+    pending  = dict(steps)
+    running  = {}
+    failures = []
+    start    = time.monotonic()
+
+    if journal:
+        for name in steps:
+            if name not in always_run and journal.step_done(name):
+                if name in secret_steps:
+                    results[name] = secret_steps[name]()
+                else:
+                    results[name] = journal.step_result(name)
+                del pending[name]
+                print(f'  Skipping {name}, finished in a previous run.')
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            if not failures:
+                ready = [name for name, (_, requires) in pending.items() if all(r in results for r in requires)]
+                for name in ready:
+                    del pending[name]
+                    running[executor.submit(step_run, name)] = name
+
+            if not running:
+                break
+
+            done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name], timings[name] = future.result()
+                    print(f'  Finished {name} in {timings[name]:.1f} seconds.')
+                except Exception as e:
+                    print(f'  ERROR: {name} failed: {e}')
+                    failures.append((name, e))
+
+    if failures:
+        name, error = failures[0]
+        raise StepError(name, error) from error
+
+    print(f'Finished {len(timings)} steps in {time.monotonic() - start:.1f} seconds '
+          f'({sum(timings.values()):.1f} seconds one after another).')
+
+    return results
+
+
+def pipeline_run(function, items, max_workers=DEFAULT_MAX_WORKERS):
+    """Calls function for each item over a pool of worker threads, as soon as
+    items yields it.
+
+    items is typically a generator that produces items slowly, such as the
+    events of a running process. It is read without waiting for the workers,
+    so that slow items never hold up the producer; items waiting for a worker
+    are queued without a limit, since the callers have a bounded number of
+    them. If the generator raises an error, the items already yielded are
+    still processed before the error is raised.
+
+    Args:
+        function (function): function called with each item
+        items (iterable): items to process
+        max_workers (int): maximum number of items processed at the same time
+
+    Returns:
+        tuple: a dictionary of items mapped to the results, and a dictionary
+            of items mapped to the errors raised
+    """
+    futures = {}
+    results = {}
+    errors  = {}
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for item in items:
+            futures[executor.submit(function, item)] = item
+
+    for future, item in futures.items():
+        try:
+            results[item] = future.result()
+        # Record the error and carry on so that one failed item doesn't
+        # stop the rest from being processed
+        except Exception as e:
+            errors[item] = e
+
+    return results, errors
@@ -0,0 +1,62 @@
+# © Copyright 2026 HP Development Company, L.P.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""Timing of the steps of a setup script.
+
+    step_timer = step_timing.StepTimer()
+    deployment = step_timer.timed('deployment_create', deployment_create, name)
+    step_timer.report_print('Anyware Manager setup')
+"""
+
+import json
+import threading
+import time
+
+
+class StepTimer:
+    """Records when the steps of a script start and how long they take.
+
+    The times are relative to when the StepTimer was created. Steps can be
+    timed from several threads.
+    """
+
+    def __init__(self):
+        self.start  = time.monotonic()
+        # Step names mapped to the seconds since start at which they started
+        # and how long they took
+        self.steps  = {}
+        self._lock  = threading.Lock()
+
+    def timed(self, name, function, *args):
+        """Calls function with args and records its timing as step name.
+
+        Returns:
+            the value returned by function
+        """
+        start = time.monotonic()
+        try:
+            return function(*args)
+        finally:
+            with self._lock:
+                self.steps[name] = {
+                    'start_seconds': round(start - self.start, 2),
+                    'seconds':       round(time.monotonic() - start, 2),
+                }
+
+    def report_print(self, title):
+        """Prints the timing of the steps as one JSON line.
+
+        Steps that overlap have start_seconds within the seconds of each other.
+
+        Args:
+            title (str): what the steps are part of, printed before the report
+        """
+        with self._lock:
+            report = {
+                'total_seconds':  round(time.monotonic() - self.start, 2),
+                'serial_seconds': round(sum(t['seconds'] for t in self.steps.values()), 2),
+                'steps':          dict(self.steps),
+            }
+        print(f'{title} timing report: {json.dumps(report)}')
@@ -0,0 +1,148 @@
+# © Copyright 2026 HP Development Company, L.P.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""Streaming of the machine-readable output of Terraform.
+
+terraform apply -json writes one JSON event per line while it runs. The
+functions of this module are generators that can be chained, so that each
+event is handled as soon as Terraform writes it:
+
+    events = terraform_stream.apply_events(terraform_bin)
+    events = terraform_stream.progress_print(events)
+    for resource in terraform_stream.resources_created(events, 'aws_instance'):
+        print(f'{resource["addr"]} was created.')
+
+See: https://developer.hashicorp.com/terraform/internals/machine-readable-ui
+"""
+
+import json
+import subprocess
+import time
+
+# Types of events whose message is printed by progress_print()
+PROGRESS_EVENT_TYPES = ['apply_start', 'apply_complete', 'apply_errored', 'change_summary']
+
+# Number of resources listed by progress_print() as the slowest to apply
+SLOWEST_RESOURCES_COUNT = 5
+
+
+def apply_events(terraform_bin, args=()):
+    """Runs terraform apply and yields the events it writes.
+
+    Args:
+        terraform_bin (str): path of the Terraform binary
+        args (list): other arguments of terraform apply
+
+    Yields:
+        dict: the events of the apply, in the order Terraform writes them
+
+    Raises:
+        subprocess.CalledProcessError: once all the events are yielded, if
+            terraform apply failed
+    """
+    cmd  = [terraform_bin, 'apply', '-auto-approve', '-json', *args]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True, bufsize=1)
+
+    try:
+        for line in proc.stdout:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # Anything else Terraform writes is passed on as a log message
+                yield {'type': 'log', '@level': 'info', '@message': line}
+    finally:
+        # Stopping Terraform in the middle of an apply could leave resources
+        # out of its state, so it is left to finish even if the events are
+        # no longer read
+        for _ in proc.stdout:
+            pass
+        proc.stdout.close()
+        proc.wait()
+
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
+
+
+def progress_print(events):
+    """Prints the progress of each resource and passes the events on.
+
+    Once all the events are passed on, the total time of the apply and the
+    resources that took the longest are printed.
+
+    Args:
+        events (iterable): events of terraform apply
+
+    Yields:
+        dict: the same events
+    """
+    start   = time.monotonic()
+    elapsed = {}
+
+    for event in events:
+        event_type = event.get('type')
+
+        if event_type in PROGRESS_EVENT_TYPES:
+            print(f'  {event.get("@message")}')
+        elif event_type == 'diagnostic':
+            diagnostic = event.get('diagnostic', {})
+            print(f'  {diagnostic.get("severity", "").upper()}: {diagnostic.get("summary")}')
+            if diagnostic.get('detail'):
+                print(f'    {diagnostic["detail"]}')
+
+        if event_type == 'apply_complete':
+            hook = event['hook']
+            elapsed[hook['resource']['addr']] = hook.get('elapsed_seconds', 0)
+
+        yield event
+
+    print(f'Applied {len(elapsed)} resources in {time.monotonic() - start:.0f} seconds.')
+    slowest = sorted(elapsed.items(), key=lambda r: r[1], reverse=True)[:SLOWEST_RESOURCES_COUNT]
+    if slowest:
+        print('Slowest resources:')
+        for addr, seconds in slowest:
+            print(f'  {seconds:>5}s  {addr}')
+
+
+def resources_created(events, resource_type):
+    """Yields the resources of a type as soon as they are created.
+
+    Args:
+        events (iterable): events of terraform apply
+        resource_type (str): type of the resources, for example aws_instance
+
+    Yields:
+        dict: the resources, with the keys addr, module, resource_type,
+            resource_name and resource_key of Terraform, and the id of the
+            resource in id_value
+    """
+    for event in events:
+        if event.get('type') != 'apply_complete':
+            continue
+
+        hook = event['hook']
+        if hook.get('action') != 'create' or hook['resource'].get('resource_type') != resource_type:
+            continue
+
+        yield {**hook['resource'], 'id_value': hook.get('id_value')}
+
+
+def outputs_get(terraform_bin):
+    """Returns the values of all the outputs with one call to terraform output.
+
+    Args:
+        terraform_bin (str): path of the Terraform binary
+
+    Returns:
+        dict: names of the outputs mapped to their values
+    """
+    comp_proc = subprocess.run([terraform_bin, 'output', '-json'],
+                               check=True,
+                               stdout=subprocess.PIPE)
+    outputs = json.loads(comp_proc.stdout.decode())
+
+    return {name: output['value'] for name, output in outputs.items()}